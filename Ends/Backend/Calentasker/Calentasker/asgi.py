@@ -2,6 +2,8 @@
 ASGI config for Calentasker project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (e.g. ``uvicorn Calentasker.asgi:application``)
+to enable the live group event streams.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -0,0 +1,37 @@
+import hashlib
+
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+from .media import url_window
+
+
+class ConditionalListMixin:
+    """
+    Conditional GET for list endpoints. get_list_validator(queryset) returns a
+    cheap fingerprint of the filtered rows (counts, max timestamps, versions);
+    when it matches the client's If-None-Match the view answers 304 without
+    fetching or serializing anything.
+    """
+
+    def get_list_validator(self, queryset):
+        raise NotImplementedError
+
+    def get_list_etag(self, request, queryset):
+        validator = self.get_list_validator(queryset)
+        user_id = getattr(request.user, 'pk', None)
+        # Responses embed signed media URLs, which are renewed every window
+        raw = f'{user_id}:{request.get_full_path()}:{validator}:{url_window()}'
+        return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+    def list(self, request, *args, **kwargs):
+        etag = self.get_list_etag(request, self.filter_queryset(self.get_queryset()))
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = self.get_list_response(request, *args, **kwargs)
+        response['ETag'] = etag
+        return response
+
+    def get_list_response(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
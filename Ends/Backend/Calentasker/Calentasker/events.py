@@ -0,0 +1,89 @@
+import asyncio
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class EventBroker:
+    """
+    Fan-out of per-group change events to live streams. publish() is called
+    from sync code (signal handlers); subscribe() is used by async views.
+    Point EVENT_BROKER at a subclass backed by Redis/PostgreSQL NOTIFY to
+    share events between worker processes.
+    """
+
+    def publish(self, group_id, event):
+        raise NotImplementedError
+
+    def subscribe(self, group_id):
+        """Returns a Subscription; call from the event loop serving the stream."""
+        raise NotImplementedError
+
+    def unsubscribe(self, group_id, subscription):
+        raise NotImplementedError
+
+
+class Subscription:
+    def __init__(self, maxsize):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        # Set when the client fell too far behind; it has to resync
+        self.overflowed = False
+
+    def push(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        """Next event, or None after `timeout` seconds without one."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InProcessBroker(EventBroker):
+    """Delivers events to streams served by this process only."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def publish(self, group_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(group_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, event)
+            except RuntimeError:
+                # Loop already closed; the stream's cleanup will drop it
+                pass
+
+    def subscribe(self, group_id):
+        subscription = Subscription(getattr(settings, 'EVENT_STREAM_QUEUE_SIZE', 100))
+        with self._lock:
+            self._subscribers.setdefault(group_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, group_id, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(group_id, set())
+            subscribers.discard(subscription)
+            if not subscribers:
+                self._subscribers.pop(group_id, None)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(getattr(settings, 'EVENT_BROKER', 'Calentasker.events.InProcessBroker'))()
+
+
+def publish_on_commit(group_id, event):
+    """Publishes once the surrounding transaction commits (immediately in autocommit)."""
+    if group_id is not None:
+        transaction.on_commit(lambda: get_broker().publish(group_id, event))
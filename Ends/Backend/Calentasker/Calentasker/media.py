@@ -0,0 +1,169 @@
+import mimetypes
+import os
+import posixpath
+import re
+import time
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.core.signing import Signer
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+
+BYTE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+BLOCK_SIZE = 64 * 1024
+
+_signer = Signer(salt='Calentasker.media')
+
+
+def clean_name(name):
+    """
+    `name` as a plain path below MEDIA_ROOT, or Http404. Storage normalizes
+    paths itself, so '..', '.', empty and leading-slash segments would
+    otherwise reach a file under another (unprotected) prefix; dot-files
+    (upload staging, temporary blobs) are never served.
+    """
+    segments = name.split('/')
+    if any(not segment or segment.startswith('.') for segment in segments):
+        raise Http404('No such file.')
+    if posixpath.normpath(name) != name:
+        raise Http404('No such file.')
+    return name
+
+
+def is_protected(name):
+    return name.startswith(tuple(getattr(settings, 'MEDIA_PROTECTED_PREFIXES', ())))
+
+
+def url_window():
+    """Index of the current MEDIA_URL_MAX_AGE window; signed URLs change with it."""
+    return int(time.time()) // getattr(settings, 'MEDIA_URL_MAX_AGE', 3600)
+
+
+def sign_url(name, url):
+    """
+    Appends an expiring signature to the URL of a protected file so that
+    <img>/<a> tags can load it without credentials. The expiry is rounded
+    up to whole MEDIA_URL_MAX_AGE windows, which keeps the URL (and the
+    browser cache entry) stable within a window.
+    """
+    if not is_protected(name):
+        return url
+    expires = (url_window() + 2) * getattr(settings, 'MEDIA_URL_MAX_AGE', 3600)
+    signature = _signer.signature(f'{name}:{expires}')
+    return f'{url}?{urlencode({"expires": expires, "signature": signature})}'
+
+
+def has_valid_signature(request, name):
+    expires = request.GET.get('expires', '')
+    signature = request.GET.get('signature', '')
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return constant_time_compare(_signer.signature(f'{name}:{expires}'), signature)
+
+
+def _byte_range(header, size):
+    """
+    (start, end) of a single "bytes=" range, None to send the whole file
+    (no, malformed or multiple ranges), or ValueError if unsatisfiable.
+    """
+    match = BYTE_RANGE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as source:
+        source.seek(start)
+        while length > 0:
+            chunk = source.read(min(BLOCK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def _range_applies(request, etag, last_modified):
+    # If-Range: only send a part if the client's copy is still current
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(last_modified)
+
+
+def serve_file(request, name, storage=default_storage, filename=None):
+    """
+    Sends a stored file with ETag/Last-Modified validators and byte ranges.
+    With MEDIA_SENDFILE set the web server does the transfer (nginx
+    'x-accel-redirect' to MEDIA_ACCEL_REDIRECT_PREFIX + name, or Apache/
+    lighttpd 'x-sendfile'); otherwise FileResponse streams it, which WSGI
+    servers hand to sendfile() through wsgi.file_wrapper.
+    """
+    name = clean_name(name)
+    try:
+        path = storage.path(name)
+        stat = os.stat(path)
+    except (SuspiciousFileOperation, FileNotFoundError, NotADirectoryError):
+        raise Http404('No such file.')
+    if not os.path.isfile(path):
+        raise Http404('No such file.')
+
+    etag = quote_etag(f'{int(stat.st_mtime):x}-{stat.st_size:x}')
+    last_modified = stat.st_mtime
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if response is None:
+        response = _transfer(request, name, path, stat.st_size, content_type, etag, last_modified)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    if filename and response.status_code < 300:
+        response['Content-Disposition'] = content_disposition_header(False, filename)
+    patch_cache_control(response, private=True, max_age=getattr(settings, 'MEDIA_URL_MAX_AGE', 3600))
+    return response
+
+
+def _transfer(request, name, path, size, content_type, etag, last_modified):
+    mode = getattr(settings, 'MEDIA_SENDFILE', None)
+    if mode == 'x-accel-redirect':
+        # nginx answers Range/If-* itself from the internal location
+        response = HttpResponse(content_type=content_type)
+        prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix + quote(name)
+        return response
+    if mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+        return response
+
+    byte_range = None
+    if request.headers.get('Range') and _range_applies(request, etag, last_modified):
+        try:
+            byte_range = _byte_range(request.headers['Range'], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    if byte_range is None:
+        return FileResponse(open(path, 'rb'), content_type=content_type)
+
+    start, end = byte_range
+    response = StreamingHttpResponse(_read_range(path, start, end - start + 1), status=206, content_type=content_type)
+    response['Content-Length'] = str(end - start + 1)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
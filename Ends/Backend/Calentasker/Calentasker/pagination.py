@@ -0,0 +1,109 @@
+import datetime
+import json
+from base64 import b64decode, b64encode
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class OptionalCursorPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination that clients can switch off with ?paginate=false
+    to get the old plain list response.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get('paginate', '').lower() == 'false':
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class TaskCursorPagination(OptionalCursorPagination):
+    ordering = ('id',)
+
+
+class CommentCursorPagination(OptionalCursorPagination):
+    ordering = ('-created_at', 'id')
+
+
+class GroupMemberCursorPagination(OptionalCursorPagination):
+    ordering = ('id',)
+
+
+class DueDateCursorPagination(BasePagination):
+    """
+    Keyset pagination over (due_key, id), where the view annotates due_key
+    as a date (see TaskViewSet.mine). CursorPagination keys on the first ordering field
+    only and steps through ties with OFFSET, which degrades when many rows
+    share a due date; this cursor carries the id as well, so each page is a
+    plain range condition. Forward only; ?paginate=false as above.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    key_field = 'due_key'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get('paginate', '').lower() == 'false':
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            key, pk = position
+            queryset = queryset.filter(
+                Q(**{f'{self.key_field}__gt': key}) | Q(**{self.key_field: key, 'pk__gt': pk})
+            )
+        rows = list(queryset.order_by(self.key_field, 'pk')[:self.page_size + 1])
+
+        self.next_position = None
+        if len(rows) > self.page_size:
+            rows = rows[:self.page_size]
+            last = rows[-1]
+            self.next_position = (str(getattr(last, self.key_field)), last.pk)
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            key, pk = json.loads(b64decode(encoded.encode('ascii')).decode('utf-8'))
+            return datetime.date.fromisoformat(key), int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        encoded = b64encode(json.dumps(self.next_position).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
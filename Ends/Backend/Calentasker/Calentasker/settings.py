@@ -51,6 +51,12 @@ EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER or 'webmaster@localhost'
 
+# Outgoing mail is queued (notifications.OutgoingEmail) and delivered by
+# `manage.py run_mail_worker`; locmem/console backends work for local runs.
+MAIL_OUTBOX_BATCH_SIZE = 100
+MAIL_OUTBOX_MAX_ATTEMPTS = 5
+MAIL_OUTBOX_RETRY_DELAY = 60  # seconds, doubled after every failed attempt
+
 
 # Application definition
 
@@ -66,6 +72,7 @@ INSTALLED_APPS = [
     'users',
     'groups',
     'tasks',
+    'notifications',
     'corsheaders',
 ]
 
@@ -128,13 +135,114 @@ WSGI_APPLICATION = 'Calentasker.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# Configured from the environment (or .env, see load_env_file above):
+#   DB_ENGINE=sqlite (default) | postgres
+#   DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT
+#   DB_CONN_MAX_AGE   persistent connection lifetime in seconds (postgres)
+#   DB_POOL=true      use the Django 5.1+ psycopg pool instead (postgres)
+#   DB_SQLITE_TUNING=false  disables the WAL/busy_timeout pragmas below
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite').lower()
+
+if DB_ENGINE in ('postgres', 'postgresql'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'calentasker'),
+            'USER': os.environ.get('DB_USER', ''),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if os.environ.get('DB_POOL', 'false').lower() == 'true':
+        # The pool replaces persistent connections; Django rejects both at once.
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', '10')),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME') or BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {},
+        }
+    }
+    if os.environ.get('DB_SQLITE_TUNING', 'true').lower() != 'false':
+        # WAL lets readers run alongside the single writer, IMMEDIATE takes the
+        # write lock up front so busy_timeout applies instead of failing with
+        # "database is locked" on lock upgrade.
+        SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('DB_SQLITE_BUSY_TIMEOUT_MS', '5000'))
+        DATABASES['default']['OPTIONS'] = {
+            'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS};'
+                f"PRAGMA mmap_size={int(os.environ.get('DB_SQLITE_MMAP_SIZE', str(128 * 1024 * 1024)))};"
+            ),
+        }
+
+
+# Cache
+# Process-local by default. Run a shared backend (Redis/Memcached) when serving
+# with several workers so that invalidations reach every process.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+# Seconds a user's {group: role} map stays cached for permission checks
+GROUP_MEMBERSHIP_CACHE_TIMEOUT = 300
+
+# Live group event streams (/api/groups/<id>/events/, ASGI only).
+# InProcessBroker only reaches streams held by the same process; run a single
+# ASGI worker or point EVENT_BROKER at a shared broker implementation.
+EVENT_BROKER = os.environ.get('EVENT_BROKER', 'Calentasker.events.InProcessBroker')
+EVENT_STREAM_HEARTBEAT = 15
+EVENT_STREAM_QUEUE_SIZE = 100
+
+# Seconds /api/tasks/sync/ moves its watermark back so that rows stamped by
+# transactions still open during a sync are sent on the next one; longer
+# transactions than this can still be missed
+SYNC_WATERMARK_MARGIN = 60
+
+# Upper bound on create + update + delete entries per /api/tasks/bulk/ request
+TASK_BULK_MAX_ITEMS = 1000
+
+# PostgreSQL text search configuration for /api/tasks/search/ ('simple' does
+# no stemming, which suits mixed Hungarian/English content)
+TASK_SEARCH_CONFIG = os.environ.get('TASK_SEARCH_CONFIG', 'simple')
+
+# Resized WebP (JPEG if Pillow lacks WebP) copies of task/group/profile
+# pictures, rendered on a thread pool after the upload commits.
+# 0 workers renders inline in the request instead.
+THUMBNAIL_SIZES = (64, 256, 1024)
+THUMBNAIL_WORKERS = int(os.environ.get('THUMBNAIL_WORKERS', 2))
+
+# Seconds an unreferenced attachment/task image blob is kept before
+# collect_blobs deletes it (covers uploads whose row is not committed yet)
+BLOB_GC_GRACE = 3600
+
+# Chunked attachment uploads (/api/attachment-uploads/): largest accepted
+# file in bytes, and seconds without a chunk before collect_blobs drops a
+# session
+ATTACHMENT_UPLOAD_MAX_SIZE = 1024 ** 3
+ATTACHMENT_UPLOAD_EXPIRY = 86400
+
+# Token -> user lookups for CachedTokenAuthentication
+AUTH_TOKEN_CACHE_ALIAS = 'default'
+AUTH_TOKEN_CACHE_TIMEOUT = 300
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -183,6 +291,16 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Task attachments/images (and their thumbnails) are only served to members
+# of the task's group or through signed URLs valid for 1-2 MEDIA_URL_MAX_AGE
+# windows. MEDIA_SENDFILE hands the transfer to the web server:
+# 'x-accel-redirect' (nginx: an `internal` location at
+# MEDIA_ACCEL_REDIRECT_PREFIX aliased to MEDIA_ROOT) or 'x-sendfile'.
+MEDIA_PROTECTED_PREFIXES = ('attachments/', 'task_images/', 'thumbnails/task_images/')
+MEDIA_URL_MAX_AGE = 3600
+MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE') or None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -190,7 +308,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -0,0 +1,85 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+from .media import sign_url
+
+# <upload_to>/<first two hex digits>/<sha256><ext>
+BLOB_NAME = re.compile(r'^(?P<directory>.+/)?(?P<fanout>[0-9a-f]{2})/(?P<digest>[0-9a-f]{64})(?P<extension>\.\w{1,10})?$')
+
+
+def blob_name(directory, digest, extension=''):
+    return os.path.join(directory, digest[:2], digest + extension).replace(os.sep, '/')
+
+
+def clean_extension(filename):
+    extension = os.path.splitext(filename)[1].lower()
+    return extension if re.fullmatch(r'\.\w{1,10}', extension) else ''
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Keeps one copy of each distinct upload. save() hashes the content while
+    writing it to a temporary file next to its final place and then renames it
+    to <upload_to>/<aa>/<sha256><ext>, or drops it when that blob already
+    exists. Names are shared between rows, so files are never deleted on
+    behalf of a single row; tasks.blobs counts the references and the
+    collect_blobs command removes orphans.
+    """
+
+    def url(self, name):
+        return sign_url(name, super().url(name))
+
+    def get_available_name(self, name, max_length=None):
+        # The final name only depends on the content (see _save)
+        return name
+
+    def _save(self, name, content):
+        directory, filename = os.path.split(name)
+        staging = self.path(directory)
+        os.makedirs(staging, exist_ok=True)
+
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=staging, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+            name = blob_name(directory, digest.hexdigest(), clean_extension(filename))
+            self._store(temp_path, name)
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+        return name
+
+    def save_local(self, path, name, digest):
+        """
+        Moves the local file at `path` (on this storage's filesystem, sha256
+        `digest`) into the blob for `name`'s directory; returns the blob name.
+        """
+        directory, filename = os.path.split(name)
+        name = blob_name(directory, digest, clean_extension(filename))
+        self._store(path, name)
+        if os.path.exists(path):
+            os.unlink(path)
+        return name
+
+    def _store(self, temp_path, name):
+        path = self.path(name)
+        if os.path.exists(path):
+            # Already stored: same digest, same bytes. Touch it so a pending
+            # garbage collection does not take it away from the new reference.
+            os.utime(path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(temp_path, self.file_permissions_mode)
+        os.replace(temp_path, path)
+
+
+content_addressed_storage = ContentAddressedStorage()
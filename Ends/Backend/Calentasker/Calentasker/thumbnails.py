@@ -0,0 +1,186 @@
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, models, transaction
+from django.utils import timezone
+from rest_framework import serializers
+from .media import sign_url
+from .storage import ContentAddressedStorage
+
+logger = logging.getLogger(__name__)
+
+# (model, image field, thumbnails field). Variants are recorded on the row as
+# {"source": <image name>, "64": <name>, ...}; "source" tells whether they
+# belong to the image currently stored.
+THUMBNAILED_FIELDS = (
+    ('tasks.Task', 'image', 'image_thumbnails'),
+    ('groups.Group', 'image', 'image_thumbnails'),
+    ('users.User', 'profile_picture', 'profile_picture_thumbnails'),
+)
+
+_executor = None
+
+
+def thumbnail_sizes():
+    return tuple(getattr(settings, 'THUMBNAIL_SIZES', (64, 256, 1024)))
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'THUMBNAIL_WORKERS', 2), thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def _format():
+    from PIL import features
+    return ('WEBP', 'webp') if features.check('webp') else ('JPEG', 'jpg')
+
+
+def variant_name(source_name, size, extension):
+    stem, _ = os.path.splitext(source_name)
+    return f'thumbnails/{stem}_{size}.{extension}'
+
+
+def existing_variants(source_name):
+    """Stored variant names of `source_name`, whatever sizes/format made them."""
+    directory, filename = os.path.split(f'thumbnails/{source_name}')
+    # Exactly <stem>_<size>.<ext>: a plain prefix match would also take the
+    # variants of img_AbCdEf1.png (Django's suffix for a clashing upload)
+    pattern = re.compile(rf'{re.escape(os.path.splitext(filename)[0])}_\d+\.(webp|jpg)')
+    try:
+        _, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return [f'{directory}/{name}' for name in files if pattern.fullmatch(name)]
+
+
+def delete_variants(names):
+    for name in names:
+        default_storage.delete(name)
+
+
+def _is_shared(model, field_name):
+    # Content addressed images can back several rows; their variants go
+    # when tasks.blobs.collect removes the blob
+    return isinstance(model._meta.get_field(field_name).storage, ContentAddressedStorage)
+
+
+def render_variants(field_file):
+    """Returns {size: (name, bytes)} for every configured size of `field_file`."""
+    from PIL import Image, ImageOps
+
+    image_format, extension = _format()
+    with field_file.open('rb') as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+    if image_format == 'JPEG' or image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if image_format == 'WEBP' and 'A' in image.getbands() else 'RGB')
+
+    variants = {}
+    for size in thumbnail_sizes():
+        variant = image.copy()
+        variant.thumbnail((size, size), Image.LANCZOS)
+        buffer = BytesIO()
+        variant.save(buffer, image_format, quality=80)
+        variants[size] = (variant_name(field_file.name, size, extension), buffer.getvalue())
+    return variants
+
+
+def generate_thumbnails(model_label, pk, field_name, thumbnails_field):
+    """
+    Renders and stores the variants of one image field, then records them on
+    the row unless the image was replaced in the meantime. Variants of the
+    previous image are deleted unless the storage shares them between rows.
+    """
+    model = apps.get_model(model_label)
+    try:
+        instance = model.objects.only('pk', field_name, thumbnails_field).get(pk=pk)
+        field_file = getattr(instance, field_name)
+        if not field_file:
+            return
+        source = field_file.name
+        previous = getattr(instance, thumbnails_field) or {}
+        # Variants are regenerated in place, so not content addressed
+        storage = default_storage
+
+        recorded = {'source': source}
+        for size, (name, content) in render_variants(field_file).items():
+            if storage.exists(name):
+                storage.delete(name)
+            recorded[str(size)] = storage.save(name, ContentFile(content))
+
+        changes = {thumbnails_field: recorded}
+        # Let list ETags and delta sync pick the new URLs up
+        field_names = {field.name for field in model._meta.get_fields()}
+        if 'updated_at' in field_names:
+            changes['updated_at'] = timezone.now()
+        if 'version' in field_names:
+            changes['version'] = models.F('version') + 1
+        updated = model.objects.filter(pk=pk, **{field_name: source}).update(**changes)
+        if _is_shared(model, field_name):
+            return
+        if updated:
+            new_names = set(recorded.values())
+            delete_variants(name for size, name in previous.items() if size != 'source' and name not in new_names)
+        else:
+            # Replaced while rendering: these belong to no image any more
+            delete_variants(name for size, name in recorded.items() if size != 'source')
+    except Exception:
+        logger.exception('Thumbnail generation failed for %s %s.%s', model_label, pk, field_name)
+
+
+def _generate_in_worker(*args):
+    try:
+        generate_thumbnails(*args)
+    finally:
+        # Pool threads would otherwise each keep a connection open
+        connection.close()
+
+
+def schedule_thumbnails(instance, field_name, thumbnails_field):
+    """
+    Called from post_save: queues variant generation once the upload is
+    committed if the stored variants belong to another (or no) image.
+    Runs inline when THUMBNAIL_WORKERS is 0.
+    """
+    field_file = getattr(instance, field_name)
+    recorded = getattr(instance, thumbnails_field) or {}
+    if not field_file:
+        if recorded:
+            type(instance).objects.filter(pk=instance.pk).update(**{thumbnails_field: {}})
+            if not _is_shared(type(instance), field_name):
+                delete_variants(name for size, name in recorded.items() if size != 'source')
+        return
+    if recorded.get('source') == field_file.name:
+        return
+
+    args = (instance._meta.label, instance.pk, field_name, thumbnails_field)
+    if getattr(settings, 'THUMBNAIL_WORKERS', 2):
+        transaction.on_commit(lambda: _get_executor().submit(_generate_in_worker, *args))
+    else:
+        transaction.on_commit(lambda: generate_thumbnails(*args))
+
+
+class ThumbnailURLsField(serializers.ReadOnlyField):
+    """{"64": url, "256": url, ...}; empty until the variants have been generated."""
+
+    def to_representation(self, value):
+        value = value or {}
+        request = self.context.get('request')
+        urls = {}
+        for size, name in value.items():
+            if size == 'source':
+                continue
+            url = sign_url(name, default_storage.url(name))
+            urls[size] = request.build_absolute_uri(url) if request else url
+        return urls
@@ -18,18 +18,22 @@ from django.contrib import admin
 from django.urls import path, include
 from rest_framework.authtoken import views
 from .api_router import api as api_router
-from tasks.views import CustomAuthToken
+from tasks.views import CustomAuthToken, protected_media
+from groups.views import group_events
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('rest_framework.urls')),
     path('api/auth/token/', views.obtain_auth_token),
+    path('api/groups/<int:group_id>/events/', group_events, name='group_events'),
     path('api/', include(api_router.urls)),
     path('api/login/', CustomAuthToken.as_view(), name='api_login'),
 ]
 
 from django.conf import settings
-from django.conf.urls.static import static
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Served in every mode: task files are checked against group membership
+# (tasks.views.protected_media)
+urlpatterns += [
+    path(settings.MEDIA_URL.lstrip('/') + '<path:name>', protected_media, name='media'),
+]
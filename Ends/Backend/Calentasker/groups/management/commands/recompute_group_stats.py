@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from groups.models import Group
+
+
+class Command(BaseCommand):
+    help = 'Recounts the per-group task counters (open, done, missed, priorities) from the tasks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', type=int, action='append', dest='groups', help='Only this group (repeatable).')
+
+    def handle(self, *args, **options):
+        drifted = Group.recompute_task_counters(options['groups'])
+        self.stdout.write(self.style.SUCCESS(f'Task counters recounted; {drifted} group(s) were out of date.'))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def remove_duplicate_memberships(apps, schema_editor):
+    # Keep the oldest membership row for every (group, user) pair
+    GroupMember = apps.get_model('groups', 'GroupMember')
+    seen = set()
+    duplicates = []
+    for member_id, group_id, user_id in GroupMember.objects.order_by('id').values_list('id', 'group_id', 'user_id'):
+        if (group_id, user_id) in seen:
+            duplicates.append(member_id)
+        else:
+            seen.add((group_id, user_id))
+    GroupMember.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0006_alter_groupmember_role'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_memberships, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='groupmember',
+            constraint=models.UniqueConstraint(fields=('group', 'user'), name='unique_group_member'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:54
+
+from django.db import migrations, models
+
+
+def build_paths(apps, schema_editor):
+    Group = apps.get_model('groups', 'Group')
+    parents = dict(Group.objects.values_list('id', 'parent_group_id'))
+    positions = {}
+
+    def position(pk, seen=()):
+        if pk not in positions:
+            parent = parents[pk]
+            if parent is None or parent in seen:
+                # roots (and any pre-existing cycle, cut here)
+                positions[pk] = (f'{pk:010d}', 0)
+            else:
+                path, depth = position(parent, seen + (pk,))
+                positions[pk] = (path + f'{pk:010d}', depth + 1)
+        return positions[pk]
+
+    groups = list(Group.objects.only('id'))
+    for group in groups:
+        group.path, group.depth = position(group.pk)
+    Group.objects.bulk_update(groups, ['path', 'depth'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0008_group_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=250),
+        ),
+        migrations.RunPython(build_paths, migrations.RunPython.noop),
+    ]
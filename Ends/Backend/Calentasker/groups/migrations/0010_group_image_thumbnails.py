@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0009_group_tree_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='image_thumbnails',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
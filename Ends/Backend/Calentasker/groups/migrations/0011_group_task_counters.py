@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:14
+
+import datetime
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+UNFINISHED = ('todo', 'in_progress', 'missed')
+
+
+def count_tasks(apps, schema_editor):
+    Group = apps.get_model('groups', 'Group')
+    Task = apps.get_model('tasks', 'Task')
+
+    unfinished = Q(status__in=UNFINISHED)
+    conditions = {
+        'open_task_count': Q(status__in=('todo', 'in_progress')),
+        'done_task_count': Q(status='done'),
+        'missed_task_count': Q(status='missed'),
+        'overdue_task_count': unfinished & Q(due_date__lt=datetime.date.today()),
+        **{f'{priority}_priority_task_count': unfinished & Q(priority=priority)
+           for priority in ('low', 'medium', 'high', 'urgent')},
+    }
+    rows = Task.objects.filter(active=True, group__isnull=False).values('group_id').annotate(
+        **{field: Count('pk', filter=condition) for field, condition in conditions.items()}
+    ).order_by()
+    for row in rows:
+        Group.objects.filter(pk=row.pop('group_id')).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0010_group_image_thumbnails'),
+        ('tasks', '0012_attachment_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='done_task_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='high_priority_task_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='low_priority_task_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='medium_priority_task_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='missed_task_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='open_task_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='overdue_task_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='urgent_priority_task_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_tasks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:33
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0011_group_task_counters'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='group',
+            name='overdue_task_count',
+        ),
+    ]
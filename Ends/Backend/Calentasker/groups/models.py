@@ -1,5 +1,25 @@
+from collections import Counter, defaultdict
+
 from django.db import models
+from django.db.models.functions import Concat, Substr
 from django.core.validators import URLValidator
+from django.utils import timezone
+
+# Materialized path: the zero-padded ids of every ancestor and the group itself,
+# e.g. "0000000001" + "0000000007". A subtree is one contiguous range of paths.
+PATH_SEGMENT = 10
+PATH_MAX_LENGTH = 250
+
+
+def path_segment(pk):
+    return f'{pk:0{PATH_SEGMENT}d}'
+
+
+def subtree_q(path, field='path'):
+    """Q for `path` and everything below it, as an index range [path, path + 1)."""
+    upper = str(int(path) + 1).zfill(len(path))
+    return models.Q(**{f'{field}__gte': path, f'{field}__lt': upper})
+
 
 class Group(models.Model):
     groupname = models.CharField(max_length=100)
@@ -13,12 +33,191 @@ class Group(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     imageUrl = models.TextField(validators=[URLValidator()], blank=True, null=True)
     image = models.ImageField(upload_to='group_images/', blank=True, null=True)
+    # Resized copies of image, filled in after upload (Calentasker/thumbnails.py)
+    image_thumbnails = models.JSONField(default=dict, blank=True, editable=False)
     active = models.BooleanField(default=True)
     parent_group = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='subgroups')
+    # Bumped whenever the group or its membership changes; part of the list ETags
+    version = models.PositiveIntegerField(default=0)
+    # Tree index, maintained by save() on create and move (see subtree_q)
+    path = models.CharField(max_length=PATH_MAX_LENGTH, db_index=True, editable=False, default='')
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    # Active task counters (see Task.counted_in): kept current by Task.save(),
+    # recounted by check_deadlines and recompute_group_stats. Overdue depends
+    # on the date and is counted on read instead (overdue_task_count()).
+    open_task_count = models.IntegerField(default=0, editable=False)
+    done_task_count = models.IntegerField(default=0, editable=False)
+    missed_task_count = models.IntegerField(default=0, editable=False)
+    # Unfinished (todo, in progress, missed) tasks by priority
+    low_priority_task_count = models.IntegerField(default=0, editable=False)
+    medium_priority_task_count = models.IntegerField(default=0, editable=False)
+    high_priority_task_count = models.IntegerField(default=0, editable=False)
+    urgent_priority_task_count = models.IntegerField(default=0, editable=False)
+
+    TASK_COUNTERS = (
+        'open_task_count', 'done_task_count', 'missed_task_count',
+        'low_priority_task_count', 'medium_priority_task_count',
+        'high_priority_task_count', 'urgent_priority_task_count',
+    )
+
+    # Written with queries only, see save()
+    QUERY_MAINTAINED = (*TASK_COUNTERS, 'path', 'depth')
 
     def __str__(self):
         return self.groupname
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_parent_id = instance.__dict__.get('parent_group_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        creating = self.pk is None
+        moved = not creating and self.parent_group_id != getattr(self, '_loaded_parent_id', self.parent_group_id)
+        if creating or moved:
+            self.check_parent(self.parent_group)
+        if not creating:
+            # Counters and the tree index are changed by queries (F() updates,
+            # _move_subtree) that this instance has not seen; never write them back
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                deferred = self.get_deferred_fields()
+                update_fields = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.attname not in deferred
+                ]
+            kwargs['update_fields'] = {*update_fields, 'version'} - set(self.QUERY_MAINTAINED)
+            # Relative, so concurrent bump_version()/adjust_task_counters() bumps survive
+            self.version = models.F('version') + 1
+        super().save(*args, **kwargs)
+        if not creating:
+            # The F() expression; reloaded on next access
+            del self.__dict__['version']
+
+        if creating:
+            self.path, self.depth = self._tree_position()
+            Group.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+        elif moved:
+            self._move_subtree()
+        self._loaded_parent_id = self.parent_group_id
+
+    def _tree_position(self):
+        parent = self.parent_group
+        if parent is None:
+            return path_segment(self.pk), 0
+        return parent.path + path_segment(self.pk), parent.depth + 1
+
+    def check_parent(self, parent):
+        """Raises ValueError if `parent` would put this group inside its own subtree or too deep."""
+        if parent is None:
+            return
+        if self.path and parent.path.startswith(self.path):
+            raise ValueError('A group cannot be moved under itself or one of its subgroups.')
+        subtree_height = 0
+        if self.path:
+            deepest = Group.objects.filter(subtree_q(self.path)).aggregate(models.Max('depth'))['depth__max']
+            subtree_height = (deepest or self.depth) - self.depth
+        if len(parent.path) + PATH_SEGMENT * (subtree_height + 1) > PATH_MAX_LENGTH:
+            raise ValueError('Groups cannot be nested this deeply.')
+
+    def _move_subtree(self):
+        old_path, old_depth = self.path, self.depth
+        self.path, self.depth = self._tree_position()
+        Group.objects.filter(subtree_q(old_path)).update(
+            path=Concat(models.Value(self.path), Substr('path', len(old_path) + 1)),
+            depth=models.F('depth') + (self.depth - old_depth),
+        )
+
+    def ancestor_ids(self):
+        return [int(self.path[i:i + PATH_SEGMENT]) for i in range(0, len(self.path) - PATH_SEGMENT, PATH_SEGMENT)]
+
+    def ancestors(self):
+        """Ancestors from the root down, one primary key lookup."""
+        return Group.objects.filter(pk__in=self.ancestor_ids()).order_by('depth')
+
+    def descendants(self):
+        """Every group below this one, in tree order, one range scan on the path index."""
+        return Group.objects.filter(subtree_q(self.path)).exclude(pk=self.pk).order_by('path')
+
+    def is_descendant_of(self, other):
+        return self.path != other.path and self.path.startswith(other.path)
+
+    def has_inactive_ancestor(self):
+        return Group.objects.filter(pk__in=self.ancestor_ids(), active=False).exists()
+
+    @classmethod
+    def bump_version(cls, group_id):
+        cls.objects.filter(pk=group_id).update(version=models.F('version') + 1)
+
+    def task_stats(self):
+        return {
+            'open': self.open_task_count,
+            'done': self.done_task_count,
+            'missed': self.missed_task_count,
+            'priority': {
+                'low': self.low_priority_task_count,
+                'medium': self.medium_priority_task_count,
+                'high': self.high_priority_task_count,
+                'urgent': self.urgent_priority_task_count,
+            },
+        }
+
+    def overdue_task_count(self, today=None):
+        """Active unfinished tasks past their due date, one COUNT (see tasks.models.overdue_q)."""
+        from tasks.models import Task, overdue_q
+
+        return Task.objects.filter(overdue_q(today or timezone.localdate()), group=self).count()
+
+    @classmethod
+    def adjust_task_counters(cls, before, after):
+        """
+        Moves one task from the counters in `before` to those in `after`,
+        both (group id, counter fields) as returned by Task.counted_in().
+        """
+        deltas = defaultdict(Counter)
+        for (group_id, fields), step in ((before, -1), (after, 1)):
+            for field in fields:
+                deltas[group_id][field] += step
+        for group_id, counts in deltas.items():
+            changes = {field: models.F(field) + delta for field, delta in counts.items() if delta}
+            if group_id is not None and changes:
+                # Groups are nested in task responses; keep their ETags honest
+                cls.objects.filter(pk=group_id).update(**changes, version=models.F('version') + 1)
+
+    @classmethod
+    def recompute_task_counters(cls, group_ids=None):
+        """
+        Recounts the counters of `group_ids` (every group when None) from their
+        tasks in one grouped query. Returns the number of groups that drifted.
+        """
+        from tasks.models import Task, task_counter_conditions
+
+        tasks = Task.objects.filter(active=True, group__isnull=False)
+        groups = cls.objects.only('pk', 'version', *cls.TASK_COUNTERS).order_by('pk')
+        if group_ids is not None:
+            group_ids = list(group_ids)
+            tasks = tasks.filter(group_id__in=group_ids)
+            groups = groups.filter(pk__in=group_ids)
+        conditions = task_counter_conditions()
+        counted = {
+            row.pop('group_id'): row
+            for row in tasks.values('group_id').annotate(
+                **{field: models.Count('pk', filter=condition) for field, condition in conditions.items()}
+            ).order_by()
+        }
+
+        drifted = []
+        for group in groups.iterator():
+            counts = counted.get(group.pk, {})
+            if any(getattr(group, field) != counts.get(field, 0) for field in cls.TASK_COUNTERS):
+                for field in cls.TASK_COUNTERS:
+                    setattr(group, field, counts.get(field, 0))
+                group.version = models.F('version') + 1
+                drifted.append(group)
+        cls.objects.bulk_update(drifted, [*cls.TASK_COUNTERS, 'version'], batch_size=500)
+        return len(drifted)
+
 class GroupMember(models.Model):
     ROLE_CHOICES = (
         ('reader', 'Reader'),
@@ -42,4 +241,9 @@ class GroupMember(models.Model):
         choices=ROLE_CHOICES,
         default='reader',
     )
-    joined_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    joined_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['group', 'user'], name='unique_group_member'),
+        ]
@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import BasePermission
+from .models import GroupMember
+
+LEADER_ROLES = ('leader',)
+MEMBER_ROLES = tuple(role for role, _ in GroupMember.ROLE_CHOICES)
+TASK_MANAGER_ROLES = ('leader', 'operator')
+
+NOT_A_MEMBER = "You are not a member of this group."
+
+
+def _memberships_cache_key(user_id):
+    return f'groups:memberships:{user_id}'
+
+
+def get_memberships(request, user=None):
+    """
+    Returns {group_id: role} for `user` (defaults to request.user).
+    Loaded at most once per request and shared across requests through the
+    cache until one of the user's GroupMember rows changes.
+    """
+    user = user or request.user
+    if not user or not user.is_authenticated:
+        return {}
+
+    per_request = getattr(request, '_group_memberships', None)
+    if per_request is None:
+        per_request = request._group_memberships = {}
+    if user.pk in per_request:
+        return per_request[user.pk]
+
+    key = _memberships_cache_key(user.pk)
+    memberships = cache.get(key)
+    if memberships is None:
+        memberships = dict(GroupMember.objects.filter(user=user).values_list('group_id', 'role'))
+        cache.set(key, memberships, getattr(settings, 'GROUP_MEMBERSHIP_CACHE_TIMEOUT', 300))
+    per_request[user.pk] = memberships
+    return memberships
+
+
+def invalidate_memberships(user_id):
+    cache.delete(_memberships_cache_key(user_id))
+
+
+def get_group_role(request, group, user=None):
+    group_id = getattr(group, 'pk', group)
+    return get_memberships(request, user).get(group_id)
+
+
+def check_group_role(request, group, roles, message, not_member_message=NOT_A_MEMBER, user=None):
+    """Raises PermissionDenied unless the user holds one of `roles` in `group`."""
+    role = get_group_role(request, group, user)
+    if role is None:
+        raise PermissionDenied(not_member_message)
+    if role not in roles:
+        raise PermissionDenied(message)
+
+
+class GroupRolePermission(BasePermission):
+    """
+    Object-level role policy. Views declare
+    `group_role_policy = {action: (roles, denial message)}` and may override
+    `get_permission_group(obj)`; objects without a group are left to the view.
+    """
+
+    def has_object_permission(self, request, view, obj):
+        policy = getattr(view, 'group_role_policy', {}).get(view.action)
+        if policy is None:
+            return True
+
+        get_group = getattr(view, 'get_permission_group', None)
+        group = get_group(obj) if get_group else obj
+        if group is None:
+            return True
+
+        roles, message = policy
+        check_group_role(request, group, roles, message)
+        return True
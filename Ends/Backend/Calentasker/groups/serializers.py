@@ -2,9 +2,13 @@ from rest_framework import serializers
 from .models import Group, GroupMember
 from users.serializers import UserListSerializer
 from users.models import User
+from users.lookups import iexact
+from Calentasker.thumbnails import ThumbnailURLsField
 
 class GroupSerializer(serializers.ModelSerializer):
     created_by = UserListSerializer(source = 'created_by_userid',read_only = True)
+    image_thumbnails = ThumbnailURLsField()
+    stats = serializers.ReadOnlyField(source='task_stats')
     class Meta:
         model = Group
         fields = (
@@ -17,13 +21,25 @@ class GroupSerializer(serializers.ModelSerializer):
             'active',
             'imageUrl',
             'image',
+            'image_thumbnails',
             'parent_group',
+            'path',
+            'depth',
+            'stats',
         )
-        read_only_fields = ('created_at', 'active',)
+        read_only_fields = ('created_at', 'active', 'path', 'depth',)
         extra_kwargs = {
             'created_by_userid': {'write_only': True},
         }
 
+    def validate_parent_group(self, parent):
+        group = self.instance or Group()
+        try:
+            group.check_parent(parent)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+        return parent
+
 class GroupMemberSerializer(serializers.ModelSerializer):
     group = serializers.PrimaryKeyRelatedField(
         queryset = Group.objects.all(),
@@ -45,7 +61,20 @@ class GroupMemberSerializer(serializers.ModelSerializer):
         model = GroupMember
         fields = ('id', 'user_detail', 'group_detail', 'user', 'group', 'username', 'email', 'role', 'joined_at')
         read_only_fields = ('joined_at', 'group_detail', 'user_detail',)
-    
+        # The unique_group_member constraint would otherwise add a
+        # UniqueTogetherValidator that makes `user` required, breaking invites
+        # by email/username; create() and update() report duplicates themselves.
+        validators = []
+
+    def update(self, instance, validated_data):
+        validated_data.pop('email', None)
+        validated_data.pop('username', None)
+        group = validated_data.get('group', instance.group)
+        user = validated_data.get('user', instance.user)
+        if GroupMember.objects.filter(group=group, user=user).exclude(pk=instance.pk).exists():
+            raise serializers.ValidationError({'detail': 'User is already a member of this group.'})
+        return super().update(instance, validated_data)
+
     def create(self, validated_data):
         # Priority: user (already in validated_data if ID passed) > email > username
         user = validated_data.get('user')
@@ -55,13 +84,13 @@ class GroupMemberSerializer(serializers.ModelSerializer):
         if not user:
             if email:
                 try:
-                    user = User.objects.get(email__iexact=email)
+                    user = iexact(User.objects.all(), email=email).get()
                     validated_data['user'] = user
                 except User.DoesNotExist:
                     raise serializers.ValidationError({'email': 'User with this email does not exist.'})
             elif username:
                 try:
-                    user = User.objects.get(username__iexact=username)
+                    user = iexact(User.objects.all(), username=username).get()
                     validated_data['user'] = user
                 except User.DoesNotExist:
                     raise serializers.ValidationError({'username': 'User with this username does not exist.'})
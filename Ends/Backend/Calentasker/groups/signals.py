@@ -0,0 +1,22 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from Calentasker.events import publish_on_commit
+from Calentasker.thumbnails import schedule_thumbnails
+from .models import Group, GroupMember
+from .permissions import invalidate_memberships
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'image' in update_fields:
+        schedule_thumbnails(instance, 'image', 'image_thumbnails')
+
+
+@receiver(post_save, sender=GroupMember)
+@receiver(post_delete, sender=GroupMember)
+def group_member_changed(sender, instance, created=None, **kwargs):
+    invalidate_memberships(instance.user_id)
+    Group.bump_version(instance.group_id)
+
+    action = 'deleted' if created is None else ('created' if created else 'updated')
+    publish_on_commit(instance.group_id, {'type': f'member.{action}', 'id': instance.pk, 'user': instance.user_id})
@@ -1,3 +1,384 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from Calentasker.events import EventBroker, get_broker
+from rest_framework.test import APIClient
+from rest_framework import status
+from users.models import User
+from groups.models import Group, GroupMember
+from tasks.models import Task, Comment
+
+
+class GroupRolePermissionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.leader = User.objects.create_user(username='leader', password='password')
+        self.reader = User.objects.create_user(username='reader', password='password')
+        self.outsider = User.objects.create_user(username='outsider', password='password')
+        self.group = Group.objects.create(groupname='Team', created_by_userid=self.leader)
+        GroupMember.objects.create(group=self.group, user=self.leader, role='leader')
+        self.reader_membership = GroupMember.objects.create(group=self.group, user=self.reader, role='reader')
+
+    def test_only_leader_can_edit_group(self):
+        self.client.force_authenticate(user=self.reader)
+        response = self.client.patch(f'/api/groups/{self.group.id}/', {'groupname': 'Renamed'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.data['detail'], 'Only Group Leaders can edit this group.')
+
+        self.client.force_authenticate(user=self.outsider)
+        response = self.client.patch(f'/api/groups/{self.group.id}/', {'groupname': 'Renamed'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.data['detail'], 'You are not a member of this group.')
+
+        self.client.force_authenticate(user=self.leader)
+        response = self.client.patch(f'/api/groups/{self.group.id}/', {'groupname': 'Renamed'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_memberships_are_cached_across_requests(self):
+        task = Task.objects.create(title='Shared', group=self.group, created_by_userid=self.leader)
+        other = Task.objects.create(title='Other', group=self.group, created_by_userid=self.leader)
+        self.client.force_authenticate(user=self.leader)
+        # task lookup + membership load + soft-delete update + group counters
+        with self.assertNumQueries(4):
+            self.client.delete(f'/api/tasks/{task.id}/')
+        # memberships now come from the cache
+        with self.assertNumQueries(3):
+            response = self.client.delete(f'/api/tasks/{other.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_role_change_invalidates_cache(self):
+        task = Task.objects.create(title='Shared', group=self.group, created_by_userid=self.leader)
+        self.client.force_authenticate(user=self.reader)
+        response = self.client.delete(f'/api/tasks/{task.id}/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.reader_membership.role = 'operator'
+        self.reader_membership.save()
+        response = self.client.delete(f'/api/tasks/{task.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_transfer_leadership_requires_leader(self):
+        self.client.force_authenticate(user=self.reader)
+        url = f'/api/groups/{self.group.id}/transfer_leadership/'
+        response = self.client.post(url, {'new_leader_id': self.reader.id})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.leader)
+        response = self.client.post(url, {'new_leader_id': self.reader.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.reader_membership.refresh_from_db()
+        self.assertEqual(self.reader_membership.role, 'leader')
+
+
+class GroupMemberConditionalListTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.leader = User.objects.create_user(username='leader', password='password')
+        self.member = User.objects.create_user(username='member', password='password')
+        self.group = Group.objects.create(groupname='Team', created_by_userid=self.leader)
+        GroupMember.objects.create(group=self.group, user=self.leader, role='leader')
+        self.membership = GroupMember.objects.create(group=self.group, user=self.member, role='reader')
+        self.client.force_authenticate(user=self.leader)
+        self.url = f'/api/group-members/?group={self.group.id}'
+
+    def test_member_list_answers_304_until_roles_change(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.membership.role = 'operator'
+        self.membership.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_member_list_etag_follows_user_edits(self):
+        etag = self.client.get(self.url)['ETag']
+        self.member.username = 'renamed'
+        self.member.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('renamed', [member['user_detail']['username'] for member in response.data['results']])
+
+
+class RecordingBroker(EventBroker):
+    published = []
+
+    def publish(self, group_id, event):
+        self.published.append((group_id, event))
+
+
+class GroupEventStreamTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        get_broker.cache_clear()
+        self.addCleanup(get_broker.cache_clear)
+        self.leader = User.objects.create_user(username='leader', password='password')
+        self.outsider = User.objects.create_user(username='outsider', password='password')
+        self.group = Group.objects.create(groupname='Live', created_by_userid=self.leader)
+        GroupMember.objects.create(group=self.group, user=self.leader, role='leader')
+        self.token = Token.objects.create(user=self.leader)
+        self.url = f'/api/groups/{self.group.id}/events/'
+
+    @override_settings(EVENT_BROKER='groups.tests.RecordingBroker')
+    def test_changes_are_published_after_commit(self):
+        RecordingBroker.published = []
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.create(title='Live', group=self.group, created_by_userid=self.leader)
+            comment = Comment.objects.create(task=task, user=self.leader, content='Hi')
+            Task.objects.create(title='Personal', created_by_userid=self.leader)
+        self.assertEqual(RecordingBroker.published, [
+            (self.group.id, {'type': 'task.created', 'id': task.id}),
+            (self.group.id, {'type': 'comment.created', 'id': comment.id, 'task': task.id}),
+        ])
+
+        other = Group.objects.create(groupname='Elsewhere', created_by_userid=self.leader)
+        RecordingBroker.published = []
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.get(pk=task.pk)
+            task.group = other
+            task.save()
+        # Both boards hear about a move
+        self.assertEqual(RecordingBroker.published, [
+            (other.id, {'type': 'task.updated', 'id': task.id}),
+            (self.group.id, {'type': 'task.updated', 'id': task.id}),
+        ])
+
+    async def test_stream_requires_membership(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+        token = await sync_to_async(Token.objects.create)(user=self.outsider)
+        response = await self.async_client.get(self.url, {'token': token.key})
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(EVENT_STREAM_HEARTBEAT=0.01)
+    async def test_stream_delivers_group_events(self):
+        response = await self.async_client.get(self.url, {'token': self.token.key})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        content = aiter(response.streaming_content)
+        self.assertEqual(await anext(content), b'retry: 5000\n\n')
+        self.assertEqual(await anext(content), b': heartbeat\n\n')
+
+        get_broker().publish(self.group.id + 1, {'type': 'task.updated', 'id': 1})
+        get_broker().publish(self.group.id, {'type': 'task.updated', 'id': 2})
+        self.assertEqual(await anext(content), b'event: task.updated\ndata: {"type": "task.updated", "id": 2}\n\n')
+        await content.aclose()
+
+
+class GroupMemberInviteTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.leader = User.objects.create_user(username='leader', password='password')
+        self.invitee = User.objects.create_user(username='invitee', email='invitee@example.com', password='password')
+        self.group = Group.objects.create(groupname='Team', created_by_userid=self.leader)
+        GroupMember.objects.create(group=self.group, user=self.leader, role='leader')
+        self.client.force_authenticate(user=self.leader)
+
+    def test_invite_by_email_or_username(self):
+        response = self.client.post('/api/group-members/', {'group': self.group.id, 'email': 'invitee@example.com'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+
+        response = self.client.post('/api/group-members/', {'group': self.group.id, 'username': 'invitee'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['detail'], 'User is already a member of this group.')
+
+    def test_membership_cannot_be_moved_onto_an_existing_member(self):
+        membership = GroupMember.objects.create(group=self.group, user=self.invitee, role='reader')
+        leader_membership = GroupMember.objects.get(group=self.group, user=self.leader)
+        response = self.client.patch(f'/api/group-members/{membership.id}/', {'user': self.leader.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['detail'], 'User is already a member of this group.')
+
+        response = self.client.patch(f'/api/group-members/{leader_membership.id}/', {'user': self.leader.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+
+
+class GroupTreeTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='gardener', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.root = self.create('Root')
+        self.team = self.create('Team', self.root)
+        self.squad = self.create('Squad', self.team)
+        self.other = self.create('Other')
+
+    def create(self, name, parent=None):
+        group = Group.objects.create(groupname=name, created_by_userid=self.user, parent_group=parent)
+        GroupMember.objects.create(group=group, user=self.user, role='leader')
+        return group
+
+    def names(self, nodes):
+        return [(node['groupname'], self.names(node['children'])) for node in nodes]
+
+    def test_paths_follow_the_hierarchy(self):
+        self.squad.refresh_from_db()
+        self.assertEqual(self.squad.depth, 2)
+        self.assertEqual(self.squad.ancestor_ids(), [self.root.id, self.team.id])
+        self.assertEqual(list(self.squad.ancestors()), [self.root, self.team])
+        self.assertEqual(list(self.root.descendants()), [self.team, self.squad])
+        self.assertTrue(self.squad.is_descendant_of(self.root))
+
+    def test_move_rewrites_the_subtree(self):
+        response = self.client.patch(f'/api/groups/{self.team.id}/', {'parent_group': self.other.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.squad.refresh_from_db()
+        self.assertEqual(self.squad.ancestor_ids(), [self.other.id, self.team.id])
+        self.assertEqual(list(self.root.descendants()), [])
+
+    def test_move_into_own_subtree_is_rejected(self):
+        response = self.client.patch(f'/api/groups/{self.root.id}/', {'parent_group': self.squad.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('parent_group', response.data)
+
+    def test_tree_endpoint_returns_nested_subtrees(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/groups/tree/')
+        self.assertEqual(self.names(response.data['tree']), [
+            ('Root', [('Team', [('Squad', [])])]),
+            ('Other', []),
+        ])
+
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/groups/tree/', {'root': self.team.id})
+        self.assertEqual(self.names(response.data['tree']), [('Team', [('Squad', [])])])
+        self.assertEqual([group['id'] for group in response.data['ancestors']], [self.root.id])
+
+    def test_soft_deleted_group_hides_its_subtree(self):
+        self.client.delete(f'/api/groups/{self.team.id}/')
+        response = self.client.get('/api/groups/tree/')
+        self.assertEqual(self.names(response.data['tree']), [('Root', []), ('Other', [])])
+        self.squad.refresh_from_db()
+        self.assertTrue(self.squad.has_inactive_ancestor())
+        response = self.client.get('/api/groups/tree/', {'root': self.squad.id})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class GroupTaskCountersTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='counter', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.group = Group.objects.create(groupname='Counted', created_by_userid=self.user)
+        self.other = Group.objects.create(groupname='Elsewhere', created_by_userid=self.user)
+        GroupMember.objects.create(group=self.group, user=self.user, role='leader')
+        self.yesterday = timezone.localdate() - timedelta(days=1)
+
+    def stats(self, group=None):
+        response = self.client.get(f'/api/groups/{(group or self.group).id}/stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def assertCountersMatchTasks(self, *groups):
+        expected = {}
+        for group in groups:
+            group.refresh_from_db()
+            expected[group.pk] = group.task_stats()
+        Group.recompute_task_counters()
+        for group in groups:
+            group.refresh_from_db()
+            self.assertEqual(group.task_stats(), expected[group.pk])
+
+    def test_counters_follow_task_changes(self):
+        task = Task.objects.create(title='Write', group=self.group, created_by_userid=self.user, priority='high')
+        late = Task.objects.create(title='Late', group=self.group, created_by_userid=self.user, due_date=self.yesterday)
+        self.assertEqual(self.stats(), {
+            'open': 2, 'done': 0, 'missed': 0, 'overdue': 1,
+            'priority': {'low': 1, 'medium': 0, 'high': 1, 'urgent': 0},
+        })
+
+        task.status = 'done'
+        task.save()
+        late = Task.objects.get(pk=late.pk)
+        late.group = self.other
+        late.save()
+        stats = self.stats()
+        self.assertEqual((stats['open'], stats['done'], stats['overdue']), (0, 1, 0))
+        self.assertEqual(stats['priority']['high'], 0)
+        self.other.refresh_from_db()
+        self.assertEqual((self.other.open_task_count, self.other.overdue_task_count()), (1, 1))
+
+        # soft delete through the API, hard delete
+        self.client.delete(f'/api/tasks/{task.id}/')
+        late.delete()
+        self.assertEqual(self.stats()['done'], 0)
+        self.assertCountersMatchTasks(self.group, self.other)
+
+    def test_bulk_and_deferred_loads_keep_counters_exact(self):
+        task = Task.objects.create(title='One', group=self.group, created_by_userid=self.user)
+        response = self.client.post('/api/tasks/bulk/', {
+            'create': [{'title': 'Two', 'group': self.group.id, 'status': 'missed'}],
+            'update': [{'id': task.id, 'status': 'done'}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual((self.stats()['done'], self.stats()['missed']), (1, 1))
+
+        partial = Task.objects.only('id', 'status').get(pk=task.pk)
+        partial.status = 'todo'
+        partial.save(update_fields=['status'])
+        self.assertEqual(self.stats()['open'], 1)
+        self.assertCountersMatchTasks(self.group)
+
+    def test_check_deadlines_moves_open_tasks_to_missed(self):
+        Task.objects.create(title='Due', group=self.group, created_by_userid=self.user, due_date=timezone.localdate())
+        # Became overdue overnight without being saved
+        Task.objects.filter(title='Due').update(due_date=self.yesterday)
+        call_command('check_deadlines', stdout=StringIO())
+        stats = self.stats()
+        self.assertEqual((stats['open'], stats['missed'], stats['overdue']), (0, 1, 1))
+
+    def test_group_saves_keep_concurrent_counter_and_version_changes(self):
+        stale = Group.objects.get(pk=self.group.pk)
+        Task.objects.create(title='Meanwhile', group=self.group, created_by_userid=self.user)
+        Group.bump_version(self.group.pk)
+        version = Group.objects.get(pk=self.group.pk).version
+
+        stale.description = 'Edited'
+        stale.save()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.open_task_count, 1)
+        self.assertEqual(self.group.description, 'Edited')
+        self.assertEqual(self.group.version, version + 1)
+        self.assertEqual(stale.version, version + 1)
+
+    def test_overdue_follows_the_date(self):
+        today = timezone.localdate()
+        task = Task.objects.create(title='Today', group=self.group, created_by_userid=self.user, due_date=today)
+        self.assertEqual(self.stats()['overdue'], 0)
+        # Past midnight, before check_deadlines has run
+        with mock.patch('django.utils.timezone.localdate', return_value=today + timedelta(days=1)):
+            self.assertEqual(self.stats()['overdue'], 1)
+            task = Task.objects.get(pk=task.pk)
+            task.status = 'done'
+            task.save()
+            self.assertEqual(self.stats()['overdue'], 0)
+        self.assertEqual(self.stats()['done'], 1)
+        self.assertCountersMatchTasks(self.group)
+
+    def test_serializer_and_repair_command(self):
+        Task.objects.create(title='One', group=self.group, created_by_userid=self.user)
+        Group.objects.filter(pk=self.group.pk).update(open_task_count=40)
+        out = StringIO()
+        call_command('recompute_group_stats', stdout=out)
+        self.assertIn('1 group(s)', out.getvalue())
+        data = self.client.get(f'/api/groups/{self.group.id}/').data
+        self.assertEqual(data['stats']['open'], 1)
+
+    def test_stats_are_for_members(self):
+        self.client.force_authenticate(user=User.objects.create_user(username='outsider', password='password'))
+        response = self.client.get(f'/api/groups/{self.group.id}/stats/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -1,13 +1,37 @@
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
-from .models import Group, GroupMember
+from rest_framework.exceptions import AuthenticationFailed, NotFound
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.db.models import Count, Max, Sum
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.shortcuts import get_object_or_404
+from .models import Group, GroupMember, subtree_q
 from .serializers import GroupSerializer, GroupMemberSerializer
+from .permissions import GroupRolePermission, LEADER_ROLES, MEMBER_ROLES, get_group_role
+from users.authentication import authenticate_token_param
+from Calentasker.events import get_broker
+from Calentasker.conditional import ConditionalListMixin
+from Calentasker.pagination import GroupMemberCursorPagination
 
 class GroupViewSet(viewsets.ModelViewSet):
     queryset = Group.objects.filter(active=True).order_by('groupname')
     serializer_class = GroupSerializer
+    permission_classes = [IsAuthenticated, GroupRolePermission]
+    group_role_policy = {
+        'update': (LEADER_ROLES, "Only Group Leaders can edit this group."),
+        'partial_update': (LEADER_ROLES, "Only Group Leaders can edit this group."),
+        'destroy': (LEADER_ROLES, "Only Group Leaders can delete this group."),
+        'transfer_leadership': (LEADER_ROLES, "Only the group leader can transfer leadership."),
+        'stats': (MEMBER_ROLES, "You are not a member of this group."),
+    }
     
     def get_queryset(self):
         queryset = Group.objects.filter(active=True).order_by('groupname')
@@ -34,39 +58,57 @@ class GroupViewSet(viewsets.ModelViewSet):
         )
 
     def perform_destroy(self, instance):
-        # Soft Delete + Permission Check
-        user = self.request.user
-        
-        # Check if user is a Leader of this group
-        try:
-            member = GroupMember.objects.get(group=instance, user=user)
-            if member.role != 'leader':
-                from rest_framework.exceptions import PermissionDenied
-                raise PermissionDenied("Only Group Leaders can delete this group.")
-        except GroupMember.DoesNotExist:
-            from rest_framework.exceptions import PermissionDenied
-            raise PermissionDenied("You are not a member of this group.")
-
-        instance.active = False
+        # Soft Delete (leader check runs in get_object via group_role_policy)
         instance.active = False
         instance.save()
 
-    def perform_update(self, serializer):
-        user = self.request.user
-        instance = serializer.instance
-        
-        # Check if user is a Leader of this group
-        try:
-            from groups.models import GroupMember
-            member = GroupMember.objects.get(group=instance, user=user)
-            if member.role != 'leader':
-                from rest_framework.exceptions import PermissionDenied
-                raise PermissionDenied("Only Group Leaders can edit this group.")
-        except GroupMember.DoesNotExist:
-            from rest_framework.exceptions import PermissionDenied
-            raise PermissionDenied("You are not a member of this group.")
+    @action(detail=False, methods=['get'])
+    def tree(self, request):
+        """
+        Nested group tree: every root (or ?root=<id> and everything below it)
+        with "children", read in one range scan of the path index. Soft-deleted
+        groups hide their whole subtree. With ?root=, "ancestors" holds the
+        path from the top down to it.
+        """
+        queryset = Group.objects.filter(active=True).select_related('created_by_userid').order_by('path')
+        root = None
+        ancestors = []
+        root_id = request.query_params.get('root')
+        if root_id:
+            root = get_object_or_404(Group.objects.filter(active=True), pk=root_id)
+            ancestors = list(root.ancestors().select_related('created_by_userid'))
+            if any(not ancestor.active for ancestor in ancestors):
+                raise NotFound('This group is inside a deleted group.')
+            queryset = queryset.filter(subtree_q(root.path))
+
+        context = self.get_serializer_context()
+        nodes = {}
+        tree = []
+        # Path order puts every parent before its children
+        for group in queryset:
+            node = {**GroupSerializer(group, context=context).data, 'children': []}
+            if group == root or (root is None and group.parent_group_id is None):
+                tree.append(node)
+            elif group.parent_group_id in nodes:
+                nodes[group.parent_group_id]['children'].append(node)
+            else:
+                # below a soft-deleted group
+                continue
+            nodes[group.pk] = node
 
-        serializer.save()
+        return Response({
+            'ancestors': GroupSerializer(ancestors, many=True, context=context).data,
+            'tree': tree,
+        })
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """
+        Task counters of the group, read from the group row (see
+        Group.task_stats), plus the overdue count as of today.
+        """
+        group = self.get_object()
+        return Response({**group.task_stats(), 'overdue': group.overdue_task_count()})
 
     @action(detail=True, methods=['post'])
     def transfer_leadership(self, request, pk=None):
@@ -77,13 +119,8 @@ class GroupViewSet(viewsets.ModelViewSet):
         if not new_leader_id:
             return Response({'detail': 'new_leader_id is required.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # 1. Verify Request User is Leader
-        try:
-            current_leader_membership = GroupMember.objects.get(group=group, user=user)
-            if current_leader_membership.role != 'leader':
-                return Response({'detail': 'Only the group leader can transfer leadership.'}, status=status.HTTP_403_FORBIDDEN)
-        except GroupMember.DoesNotExist:
-             return Response({'detail': 'You are not a member of this group.'}, status=status.HTTP_403_FORBIDDEN)
+        # 1. Request User is Leader (checked by group_role_policy)
+        current_leader_membership = GroupMember.objects.get(group=group, user=user)
 
         # 2. Verify New Leader is a Member
         try:
@@ -100,9 +137,19 @@ class GroupViewSet(viewsets.ModelViewSet):
         
         return Response({'detail': 'Leadership transferred successfully.'})
 
-class GroupMemberViewSet(viewsets.ModelViewSet):
+@method_decorator(cache_control(private=True, no_cache=True, max_age=0), name='dispatch')
+class GroupMemberViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = GroupMember.objects.all()
     serializer_class = GroupMemberSerializer
+    pagination_class = GroupMemberCursorPagination
+
+    def get_list_validator(self, queryset):
+        # Role changes and group edits both bump Group.version (groups/signals.py);
+        # nested members and group creators carry their own updated_at
+        return queryset.aggregate(
+            count=Count('id'), last=Max('id'), groups=Sum('group__version'),
+            users=Max('user__updated_at'), group_creators=Max('group__created_by_userid__updated_at'),
+        )
 
     def get_queryset(self):
         queryset = self.queryset
@@ -118,4 +165,45 @@ class GroupMemberViewSet(viewsets.ModelViewSet):
         # Ensure we only return members of ACTIVE groups
         queryset = queryset.filter(group__active=True)
             
-        return queryset
\ No newline at end of file
+        return queryset
+
+
+async def group_events(request, group_id):
+    """
+    Server-Sent Events stream of changes to one group's tasks, comments,
+    assignments and members. Each event only names what changed; clients
+    refetch (e.g. /api/tasks/sync/) on receipt. Needs the ASGI server.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'Event streams are only served by the ASGI application.'}, status=503)
+    try:
+        user = await sync_to_async(authenticate_token_param)(request)
+    except AuthenticationFailed as exc:
+        return JsonResponse({'detail': str(exc.detail)}, status=401)
+    if await sync_to_async(get_group_role)(request, group_id, user) is None:
+        return JsonResponse({'detail': 'You are not a member of this group.'}, status=403)
+
+    heartbeat = getattr(settings, 'EVENT_STREAM_HEARTBEAT', 15)
+
+    async def stream():
+        broker = get_broker()
+        subscription = broker.subscribe(group_id)
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                event = await subscription.get(heartbeat)
+                if subscription.overflowed:
+                    # Missed events: the client has to refetch, then reconnect
+                    yield 'event: resync\ndata: {}\n\n'
+                    return
+                if event is None:
+                    yield ': heartbeat\n\n'
+                else:
+                    yield f'event: {event["type"]}\ndata: {json.dumps(event)}\n\n'
+        finally:
+            broker.unsubscribe(group_id, subscription)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import OutgoingEmail
+
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject',)
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
@@ -0,0 +1,26 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from notifications.outbox import claim_batch, deliver_batch
+
+
+class Command(BaseCommand):
+    help = 'Drains the outgoing email queue in batches over a single SMTP connection per batch, retrying with backoff.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'MAIL_OUTBOX_BATCH_SIZE', 100))
+        parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Exit once no due messages are left.')
+
+    def handle(self, *args, **options):
+        while True:
+            batch = claim_batch(options['batch_size'])
+            if batch:
+                sent = deliver_batch(batch)
+                self.stdout.write(self.style.SUCCESS(f'Sent {sent}/{len(batch)} email(s).'))
+                continue
+
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
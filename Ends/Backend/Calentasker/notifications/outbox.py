@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection as db_connection, transaction
+from django.utils import timezone
+from .models import OutgoingEmail
+
+
+def enqueue_email(subject, message, from_email, recipient_list):
+    """Stores a message for run_mail_worker instead of talking SMTP in-request."""
+    return OutgoingEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(recipient_list),
+    )
+
+
+def enqueue_mass_mail(datatuple, batch_size=1000):
+    """Bulk variant taking send_mass_mail style (subject, message, from, recipients) tuples."""
+    return OutgoingEmail.objects.bulk_create(
+        [
+            OutgoingEmail(subject=subject, body=message, from_email=from_email or settings.DEFAULT_FROM_EMAIL, to=list(recipients))
+            for subject, message, from_email, recipients in datatuple
+        ],
+        batch_size=batch_size,
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff: base, 2*base, 4*base ... capped at one day."""
+    base = getattr(settings, 'MAIL_OUTBOX_RETRY_DELAY', 60)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 24 * 60 * 60))
+
+
+def claim_batch(batch_size, lease=timedelta(minutes=5)):
+    """
+    Picks due pending messages and pushes their next_attempt_at forward by
+    `lease`, so a crashed worker's batch is retried after the lease expires
+    and concurrent workers do not pick the same rows.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        queryset = OutgoingEmail.objects.filter(status='pending', next_attempt_at__lte=now).order_by('next_attempt_at', 'id')
+        if db_connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        batch = list(queryset[:batch_size])
+        OutgoingEmail.objects.filter(id__in=[email.id for email in batch]).update(next_attempt_at=now + lease)
+    return batch
+
+
+def deliver_batch(batch):
+    """Sends `batch` over one connection and records the outcome. Returns the number sent."""
+    max_attempts = getattr(settings, 'MAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    now = timezone.now()
+    sent = 0
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+        open_error = None
+    except Exception as e:
+        open_error = e
+
+    for email in batch:
+        email.attempts += 1
+        try:
+            if open_error:
+                raise open_error
+            EmailMessage(email.subject, email.body, email.from_email, email.to, connection=connection).send()
+        except Exception as e:
+            email.last_error = str(e)
+            if email.attempts >= max_attempts:
+                email.status = 'failed'
+            else:
+                email.next_attempt_at = now + retry_delay(email.attempts)
+        else:
+            email.status = 'sent'
+            email.sent_at = timezone.now()
+            email.last_error = ''
+            sent += 1
+
+    if not open_error:
+        connection.close()
+
+    OutgoingEmail.objects.bulk_update(batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'])
+    return sent
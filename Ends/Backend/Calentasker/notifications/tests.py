@@ -0,0 +1,62 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from .models import OutgoingEmail
+from .outbox import enqueue_email
+
+
+class MailWorkerTest(TestCase):
+    def run_worker(self):
+        call_command('run_mail_worker', '--once', stdout=StringIO())
+
+    def test_worker_sends_pending_messages(self):
+        enqueue_email('Hello', 'Body', 'system@calentasker.com', ['a@example.com'])
+        enqueue_email('Hello again', 'Body', None, ['b@example.com'])
+        self.run_worker()
+
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(OutgoingEmail.objects.filter(status='sent').count(), 2)
+        self.run_worker()
+        self.assertEqual(len(mail.outbox), 2)
+
+    @override_settings(MAIL_OUTBOX_MAX_ATTEMPTS=2, MAIL_OUTBOX_RETRY_DELAY=60)
+    def test_failed_delivery_is_retried_with_backoff(self):
+        email = enqueue_email('Flaky', 'Body', None, ['c@example.com'])
+        with mock.patch('django.core.mail.EmailMessage.send', side_effect=OSError('SMTP down')):
+            self.run_worker()
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'pending')
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(email.last_error, 'SMTP down')
+        self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=30))
+
+        # Not due yet: nothing is picked up
+        self.run_worker()
+        self.assertEqual(OutgoingEmail.objects.get(pk=email.pk).attempts, 1)
+
+        OutgoingEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+        with mock.patch('django.core.mail.EmailMessage.send', side_effect=OSError('SMTP down')):
+            self.run_worker()
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'failed')
+        self.assertEqual(email.attempts, 2)
+
+    def test_registration_only_enqueues(self):
+        response = APIClient().post('/api/users/', {
+            'username': 'queued',
+            'email': 'queued@example.com',
+            'password': 'password123',
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(OutgoingEmail.objects.get().to, ['queued@example.com'])
+
+        self.run_worker()
+        self.assertEqual(mail.outbox[0].subject, 'Activate your Calentasker account')
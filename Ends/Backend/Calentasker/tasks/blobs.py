@@ -0,0 +1,149 @@
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from Calentasker import thumbnails
+from Calentasker.storage import BLOB_NAME, content_addressed_storage
+from .models import Task, Attachments, Blob
+
+# Every (model, field) stored in content_addressed_storage
+REFERENCES = ((Attachments, 'file'), (Task, 'image'))
+
+
+def add_reference(name):
+    Blob.objects.bulk_create([Blob(name=name)], ignore_conflicts=True)
+    Blob.objects.filter(name=name).update(refcount=F('refcount') + 1, updated_at=timezone.now())
+
+
+def drop_reference(name):
+    Blob.objects.filter(name=name).update(refcount=F('refcount') - 1, updated_at=timezone.now())
+
+
+def track_references(instance, field_name):
+    """
+    post_save: moves the row's reference from the blob it was loaded with
+    (or last saved with) to the one it holds now.
+    """
+    attribute = f'_stored_{field_name}'
+    stored = getattr(instance, attribute, None)
+    current = getattr(instance, field_name).name or None
+    if stored == current:
+        return
+    if stored:
+        drop_reference(stored)
+    if current:
+        add_reference(current)
+    setattr(instance, attribute, current)
+
+
+def count_references():
+    counts = Counter()
+    for model, field in REFERENCES:
+        rows = model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+        for name, references in rows.values_list(field).annotate(references=Count('pk')).order_by():
+            counts[name] += references
+    return counts
+
+
+@transaction.atomic
+def recount():
+    """Resets every refcount from the rows themselves; returns how many were off."""
+    counts = count_references()
+    now = timezone.now()
+    blobs = Blob.objects.select_for_update().in_bulk(field_name='name')
+    Blob.objects.bulk_create(
+        [Blob(name=name, refcount=count) for name, count in counts.items() if name not in blobs],
+        batch_size=500,
+    )
+    drifted = []
+    for name, blob in blobs.items():
+        if blob.refcount != counts.get(name, 0):
+            blob.refcount = counts.get(name, 0)
+            blob.updated_at = now
+            drifted.append(blob)
+    Blob.objects.bulk_update(drifted, ['refcount', 'updated_at'], batch_size=500)
+    return len(drifted) + len(set(counts) - set(blobs))
+
+
+def _modified_before(name, cutoff):
+    try:
+        modified = content_addressed_storage.get_modified_time(name)
+    except FileNotFoundError:
+        return True
+    return modified < cutoff
+
+
+def collect(dry_run=False):
+    """
+    Deletes blobs nobody has referenced for BLOB_GC_GRACE seconds, and files
+    in the blob directories that have no Blob row at all (rolled back
+    uploads, interrupted writes). Returns the deleted names.
+    """
+    recount()
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'BLOB_GC_GRACE', 3600))
+    storage = content_addressed_storage
+    removed = []
+
+    for blob in Blob.objects.filter(refcount__lte=0, updated_at__lt=cutoff).iterator():
+        # A fresh upload of the same content touches the file; leave it be
+        if not _modified_before(blob.name, cutoff):
+            continue
+        if dry_run:
+            removed += [blob.name, *thumbnails.existing_variants(blob.name)]
+            continue
+        # Skip it if a reference was added since the query
+        if Blob.objects.filter(pk=blob.pk, refcount__lte=0).delete()[0]:
+            storage.delete(blob.name)
+            removed += [blob.name, *_delete_variants(blob.name)]
+
+    known = set(Blob.objects.values_list('name', flat=True))
+    for model, field in REFERENCES:
+        directory = model._meta.get_field(field).upload_to.rstrip('/')
+        if not storage.exists(directory):
+            continue
+        for root, _, files in os.walk(storage.path(directory)):
+            for filename in files:
+                name = os.path.relpath(os.path.join(root, filename), storage.location).replace(os.sep, '/')
+                if name in known or not _modified_before(name, cutoff):
+                    continue
+                if dry_run:
+                    removed += [name, *thumbnails.existing_variants(name)]
+                    continue
+                storage.delete(name)
+                removed += [name, *_delete_variants(name)]
+    return removed
+
+
+def _delete_variants(name):
+    variants = thumbnails.existing_variants(name)
+    thumbnails.delete_variants(variants)
+    return variants
+
+
+def rehash_legacy():
+    """
+    Moves files saved before content addressing (random-suffix names) into
+    the blob layout and repoints their rows; byte-identical copies collapse
+    into one blob. The old files are left for collect() to remove.
+    Returns the number of files moved.
+    """
+    storage = content_addressed_storage
+    moved = 0
+    for name in sorted(count_references()):
+        if BLOB_NAME.match(name) or not storage.exists(name):
+            continue
+        with storage.open(name) as content:
+            new_name = storage.save(name, content)
+        with transaction.atomic():
+            references = 0
+            for model, field in REFERENCES:
+                references += model.objects.filter(**{field: name}).update(**{field: new_name})
+            Blob.objects.filter(name=name).update(refcount=0, updated_at=timezone.now())
+            Blob.objects.bulk_create([Blob(name=new_name)], ignore_conflicts=True)
+            Blob.objects.filter(name=new_name).update(refcount=F('refcount') + references, updated_at=timezone.now())
+        moved += 1
+    return moved
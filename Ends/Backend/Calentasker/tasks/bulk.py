@@ -0,0 +1,185 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from Calentasker.events import publish_on_commit
+from groups.models import Group
+from groups.permissions import TASK_MANAGER_ROLES, check_group_role, get_group_role
+from users.models import User
+from . import search
+from .models import Task, Assigned, TaskMove
+from .serializers import TaskBulkItemSerializer
+
+MANAGER_MESSAGE = "Only Leaders and Operators can create, move or delete tasks in this group."
+
+
+def _validate_items(data, key, partial):
+    items = data.get(key, [])
+    if not isinstance(items, list):
+        raise ValidationError({key: 'Expected a list.'})
+    serializer = TaskBulkItemSerializer(data=items, many=True, partial=partial)
+    if not serializer.is_valid():
+        raise ValidationError({key: serializer.errors})
+    return serializer.validated_data
+
+
+def _resolve(rows, pk, label):
+    if pk is None:
+        return None
+    if pk not in rows:
+        raise ValidationError({'detail': f'Unknown {label}: {pk}.'})
+    return rows[pk]
+
+
+def apply_bulk(request, data):
+    """
+    Applies {"create": [...], "update": [{"id": ..., ...}], "delete": [ids]}
+    in one transaction and returns the (created, updated, deleted) task ids.
+
+    Groups and users are fetched once with in_bulk and each group's role is
+    checked once: members may edit their group's tasks, Leaders/Operators may
+    create, move tasks in or out, and delete. Personal tasks stay with their
+    creator.
+    Like a single PATCH, updates leave the assignment rows alone.
+    """
+    if not isinstance(data, dict):
+        raise ValidationError({'detail': 'Expected an object with create, update and delete lists.'})
+    creates = _validate_items(data, 'create', partial=False)
+    updates = _validate_items(data, 'update', partial=True)
+    delete_ids = data.get('delete', [])
+    if not isinstance(delete_ids, list) or not all(isinstance(pk, int) for pk in delete_ids):
+        raise ValidationError({'delete': 'Expected a list of task ids.'})
+
+    limit = getattr(settings, 'TASK_BULK_MAX_ITEMS', 1000)
+    if len(creates) + len(updates) + len(delete_ids) > limit:
+        raise ValidationError({'detail': f'At most {limit} operations per request.'})
+    if any('id' not in item for item in updates):
+        raise ValidationError({'update': 'Every update needs an id.'})
+    update_ids = [item['id'] for item in updates]
+    if len(set(update_ids)) != len(update_ids) or set(update_ids) & set(delete_ids):
+        raise ValidationError({'detail': 'A task may only be updated or deleted once per request.'})
+
+    existing = Task.objects.filter(active=True).filter(
+        Q(group__isnull=True) | Q(group__active=True)
+    ).in_bulk(update_ids + delete_ids)
+    missing = sorted(set(update_ids + delete_ids) - set(existing))
+    if missing:
+        raise ValidationError({'detail': f'Unknown or deleted tasks: {missing}.'})
+
+    group_ids = {item['group'] for item in creates + updates if item.get('group')}
+    group_ids.update(task.group_id for task in existing.values() if task.group_id)
+    groups = Group.objects.filter(active=True).in_bulk(group_ids) if group_ids else {}
+    user_ids = set()
+    for item in creates + updates:
+        user_ids.update(filter(None, (item.get('created_by_userid'), item.get('assigned_to_userid'))))
+        user_ids.update(item.get('assignee_ids', ()))
+    users = User.objects.in_bulk(user_ids) if user_ids else {}
+
+    # group id -> needs manager role; personal tasks are checked right away
+    required = {}
+
+    def require(group_id, manager):
+        required[group_id] = required.get(group_id, False) or manager
+
+    def require_owner(task):
+        if task.created_by_userid_id != request.user.pk:
+            raise PermissionDenied("You can only change your own personal tasks.")
+
+    for item in creates:
+        if item.get('group') is not None:
+            require(item['group'], manager=True)
+        elif item.get('created_by_userid') not in (None, request.user.pk):
+            raise PermissionDenied("You can only create personal tasks for yourself.")
+    for item in updates:
+        task = existing[item['id']]
+        if task.group_id:
+            require(task.group_id, manager=False)
+        else:
+            require_owner(task)
+        # {"group": null} is a move too: out of the group into someone's personal tasks
+        if 'group' in item and item['group'] != task.group_id:
+            if task.group_id:
+                require(task.group_id, manager=True)
+            if item['group'] is not None:
+                require(item['group'], manager=True)
+    for pk in delete_ids:
+        task = existing[pk]
+        if task.group_id:
+            require(task.group_id, manager=True)
+        else:
+            require_owner(task)
+
+    for group_id, manager in required.items():
+        _resolve(groups, group_id, 'group')
+        if manager:
+            check_group_role(request, group_id, TASK_MANAGER_ROLES, MANAGER_MESSAGE)
+        elif get_group_role(request, group_id) is None:
+            raise PermissionDenied("You are not a member of this server.")
+
+    # Moves change the task objects in place; remember where they came from
+    source_groups = {task.group_id for task in existing.values()}
+    now = timezone.now()
+    with transaction.atomic():
+        new_tasks = []
+        assignments = []
+        for item in creates:
+            fields = {key: value for key, value in item.items() if key not in (
+                'id', 'group', 'created_by_userid', 'assigned_to_userid', 'assignee_ids')}
+            assignees = [users[pk] for pk in item.get('assignee_ids', ()) if pk in users]
+            task = Task(
+                **fields,
+                group=_resolve(groups, item.get('group'), 'group'),
+                created_by_userid=_resolve(users, item.get('created_by_userid'), 'user') or request.user,
+                assigned_to_userid=_resolve(users, item.get('assigned_to_userid'), 'user'),
+            )
+            # Same primary assignee fallback as TaskSerializer.create
+            if assignees and 'assigned_to_userid' not in item:
+                task.assigned_to_userid = assignees[0]
+            task.sync_completed_at()
+            new_tasks.append(task)
+            assignments += [Assigned(task=task, user=user) for user in assignees]
+        Task.objects.bulk_create(new_tasks)
+        Assigned.objects.bulk_create(assignments)
+
+        changed_tasks = []
+        moves = []
+        changed_fields = {'completed_at', 'updated_at'}
+        for item in updates:
+            task = existing[item['id']]
+            if 'group' in item and item['group'] != task.group_id:
+                publish_on_commit(task.group_id, {'type': 'task.updated', 'id': task.pk})
+                moves.append(TaskMove(task=task, group_id=task.group_id, moved_at=now))
+            for field, value in item.items():
+                if field in ('id', 'assignee_ids'):
+                    continue
+                if field == 'group':
+                    value = _resolve(groups, value, 'group')
+                elif field in ('created_by_userid', 'assigned_to_userid'):
+                    value = _resolve(users, value, 'user')
+                setattr(task, field, value)
+                changed_fields.add(field)
+            task.sync_completed_at()
+            # bulk_update skips auto_now
+            task.updated_at = now
+            changed_tasks.append(task)
+        if changed_tasks:
+            Task.objects.bulk_update(changed_tasks, sorted(changed_fields), batch_size=500)
+        TaskMove.objects.bulk_create(moves)
+
+        if delete_ids:
+            Task.objects.filter(pk__in=delete_ids).update(active=False, updated_at=now)
+
+        # bulk writes bypass Task.save() and the post_save signals that feed
+        # the group counters, the search index and the event streams
+        touched_groups = source_groups | {task.group_id for task in new_tasks + changed_tasks}
+        Group.recompute_task_counters(touched_groups - {None})
+        search.index_tasks([task.pk for task in new_tasks] + update_ids)
+        for task in new_tasks:
+            publish_on_commit(task.group_id, {'type': 'task.created', 'id': task.pk})
+        for task in changed_tasks:
+            publish_on_commit(task.group_id, {'type': 'task.updated', 'id': task.pk})
+        for pk in delete_ids:
+            publish_on_commit(existing[pk].group_id, {'type': 'task.updated', 'id': pk})
+
+    return [task.pk for task in new_tasks], update_ids, delete_ids
@@ -0,0 +1,89 @@
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction, OperationalError
+from django.utils import timezone
+from groups.models import Group
+from tasks.models import Task
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Concurrent read/write load test against the configured database. '
+        'Run it on a scratch database, e.g. with and without the SQLite tuning:\n'
+        '  DB_NAME=/tmp/bench.sqlite3 python manage.py migrate\n'
+        '  DB_NAME=/tmp/bench.sqlite3 DB_SQLITE_TUNING=false python manage.py bench_db_concurrency\n'
+        '  DB_NAME=/tmp/bench.sqlite3 python manage.py bench_db_concurrency'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=10.0)
+        parser.add_argument('--write-ratio', type=float, default=0.3, help='Share of operations that write.')
+        parser.add_argument('--tasks', type=int, default=2000, help='Tasks to seed for the run.')
+
+    def handle(self, *args, **options):
+        user = User.objects.create(username=f'bench_{int(time.time())}', email='bench@example.com')
+        group = Group.objects.create(groupname='Concurrency bench', created_by_userid=user)
+        Task.objects.bulk_create(
+            [Task(title=f'Bench task {i}', group=group, created_by_userid=user) for i in range(options['tasks'])],
+            batch_size=1000,
+        )
+        task_ids = list(Task.objects.filter(group=group).values_list('id', flat=True))
+
+        stats = {'reads': 0, 'writes': 0, 'locked': 0, 'latencies': []}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['seconds']
+
+        def worker():
+            rng = random.Random()
+            local = {'reads': 0, 'writes': 0, 'locked': 0, 'latencies': []}
+            try:
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    try:
+                        if rng.random() < options['write_ratio']:
+                            with transaction.atomic():
+                                Task.objects.filter(pk=rng.choice(task_ids)).update(
+                                    status=rng.choice(('todo', 'in_progress', 'done')),
+                                    updated_at=timezone.now(),
+                                )
+                            local['writes'] += 1
+                        else:
+                            list(Task.objects.filter(group=group, active=True).order_by('id')[:50])
+                            local['reads'] += 1
+                    except OperationalError:
+                        local['locked'] += 1
+                    local['latencies'].append(time.perf_counter() - started)
+            finally:
+                connection.close()
+                with lock:
+                    for key in ('reads', 'writes', 'locked'):
+                        stats[key] += local[key]
+                    stats['latencies'] += local['latencies']
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        group.delete()
+        Task.objects.filter(id__in=task_ids).delete()
+        user.delete()
+
+        latencies = sorted(stats['latencies']) or [0]
+        total = stats['reads'] + stats['writes']
+        self.stdout.write(f"engine: {connection.vendor}, options: {connection.settings_dict.get('OPTIONS')}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{total / options['seconds']:.0f} ops/s "
+            f"({stats['reads']} reads, {stats['writes']} writes, {stats['locked']} 'database is locked' errors)"
+        ))
+        self.stdout.write(
+            f"latency p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+            f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms, "
+            f"max {latencies[-1] * 1000:.1f} ms"
+        )
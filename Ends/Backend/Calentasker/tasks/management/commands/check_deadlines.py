@@ -1,16 +1,26 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from django.core.mail import send_mail
+from notifications.outbox import enqueue_mass_mail
+from groups.models import Group
 from tasks.models import Task
 from datetime import timedelta
 
+SENDER = 'system@calentasker.com'
+
+
 class Command(BaseCommand):
     help = 'Checks for missed deadlines and upcoming tasks to send notifications'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per UPDATE and per mail batch.')
+
     def handle(self, *args, **options):
         now = timezone.now().date()
         today = now
         tomorrow = today + timedelta(days=1)
+        batch_size = options['batch_size']
+        verbose = options['verbosity'] >= 2
+        notifications = []
 
         # 1. Handle Missed Tasks
         # Filter: Due date is in the past, status is not 'done'/'archived'/'missed'
@@ -19,31 +29,41 @@ class Command(BaseCommand):
             active=True
         ).exclude(
             status__in=['done', 'archived', 'missed']
-        )
+        ).order_by('id')
+
+        # Updated rows drop out of the filter, so re-reading the first batch
+        # walks the whole set without OFFSET.
+        missed_count = 0
+        while True:
+            batch = list(missed_tasks.values('id', 'group_id', 'title', 'due_date', 'assigned_to_userid__email')[:batch_size])
+            if not batch:
+                break
 
-        for task in missed_tasks:
-            self.stdout.write(self.style.WARNING(f'Task "{task.title}" skipped deadline ({task.due_date})'))
-            
-            # Update status
-            task.status = 'missed'
-            task.save()
+            # Same transition Task.save() applies: 'missed' is never completed
+            Task.objects.filter(id__in=[task['id'] for task in batch]).update(
+                status='missed',
+                completed_at=None,
+                updated_at=timezone.now(),
+            )
+            missed_count += len(batch)
 
-            # Notify User
-            if task.assigned_to_userid and task.assigned_to_userid.email:
-                subject = f"MISSED: {task.title}"
-                message = f"Task '{task.title}' was due on {task.due_date} and is now marked as missed."
-                
-                try:
-                    send_mail(
-                        subject,
-                        message,
-                        'system@calentasker.com',
-                        [task.assigned_to_userid.email],
-                        fail_silently=False,
-                    )
-                    self.stdout.write(self.style.SUCCESS(f'  Notification sent to {task.assigned_to_userid.email}'))
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f'  Failed to send email: {e}'))
+            for task in batch:
+                if verbose:
+                    self.stdout.write(self.style.WARNING(f'Task "{task["title"]}" skipped deadline ({task["due_date"]})'))
+                if task['assigned_to_userid__email']:
+                    notifications.append((
+                        f"MISSED: {task['title']}",
+                        f"Task '{task['title']}' was due on {task['due_date']} and is now marked as missed.",
+                        SENDER,
+                        [task['assigned_to_userid__email']],
+                    ))
+
+        self.stdout.write(self.style.WARNING(f'{missed_count} task(s) marked as missed.'))
+
+        # The UPDATEs above bypass Task.save(); a full recount also repairs
+        # any drift from concurrent saves of the same task
+        drifted = Group.recompute_task_counters()
+        self.stdout.write(self.style.NOTICE(f'Task counters recounted; {drifted} group(s) were out of date.'))
 
         # 2. Handle Upcoming Tasks (Due Tomorrow)
         # Filter: Due date is exactly tomorrow, status is active/todo/in_progress
@@ -51,27 +71,26 @@ class Command(BaseCommand):
             due_date=tomorrow,
             active=True,
             status__in=['todo', 'in_progress', 'missed'] # Typically notify for todo/in_progress, maybe missed if re-activated
-        )
+        ).values('title', 'due_date', 'assigned_to_userid__email')
+
+        upcoming_count = 0
+        for task in upcoming_tasks.iterator(chunk_size=batch_size):
+            upcoming_count += 1
+            if task['assigned_to_userid__email']:
+                if verbose:
+                    self.stdout.write(self.style.NOTICE(f'Task "{task["title"]}" is due tomorrow ({task["due_date"]})'))
+                notifications.append((
+                    f"REMINDER: {task['title']} is due tomorrow",
+                    f"Task '{task['title']}' is due on {task['due_date']}. Please ensure it is completed.",
+                    SENDER,
+                    [task['assigned_to_userid__email']],
+                ))
+            elif verbose:
+                self.stdout.write(self.style.NOTICE(f'Task "{task["title"]}" is due tomorrow but has no assigned user email.'))
 
-        for task in upcoming_tasks:
-            if task.assigned_to_userid and task.assigned_to_userid.email:
-                self.stdout.write(self.style.NOTICE(f'Task "{task.title}" is due tomorrow ({task.due_date})'))
-                
-                subject = f"REMINDER: {task.title} is due tomorrow"
-                message = f"Task '{task.title}' is due on {task.due_date}. Please ensure it is completed."
-                
-                try:
-                    send_mail(
-                        subject,
-                        message,
-                        'system@calentasker.com',
-                        [task.assigned_to_userid.email],
-                        fail_silently=False,
-                    )
-                    self.stdout.write(self.style.SUCCESS(f'  Notification sent to {task.assigned_to_userid.email}'))
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f'  Failed to send email: {e}'))
-            else:
-                 self.stdout.write(self.style.NOTICE(f'Task "{task.title}" is due tomorrow but has no assigned user email.'))
+        self.stdout.write(self.style.NOTICE(f'{upcoming_count} task(s) due tomorrow.'))
 
+        # Delivered by run_mail_worker over a pooled connection
+        enqueue_mass_mail(notifications, batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f'  {len(notifications)} notification(s) queued.'))
         self.stdout.write(self.style.SUCCESS('Check complete.'))
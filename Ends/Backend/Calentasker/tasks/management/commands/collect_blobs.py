@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from tasks import blobs, uploads
+
+
+class Command(BaseCommand):
+    help = 'Deletes unreferenced attachment/task image files and abandoned chunked uploads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='List what would be deleted without deleting it.')
+        parser.add_argument(
+            '--rehash', action='store_true',
+            help='First move files uploaded before content addressing into the blob layout (merging duplicates).',
+        )
+
+    def handle(self, *args, **options):
+        if options['rehash'] and not options['dry_run']:
+            moved = blobs.rehash_legacy()
+            self.stdout.write(f'{moved} legacy file(s) moved; run generate_thumbnails to refresh their variants.')
+        if not options['dry_run']:
+            expired = uploads.expire_uploads()
+            self.stdout.write(f'{expired} abandoned upload(s) dropped.')
+        removed = blobs.collect(dry_run=options['dry_run'])
+        for name in removed:
+            self.stdout.write(name)
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(removed)} file(s).'))
@@ -0,0 +1,117 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from groups.models import Group, GroupMember
+from tasks.models import Task, Comment
+from users.models import User
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a throwaway dataset and prints query plans and timings for the hot '
+        'task/comment/membership lookups, with and without the access-path indexes. '
+        'Everything runs inside a transaction that is rolled back at the end.'
+    )
+
+    INDEXED_MODELS = (Task, Comment)
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=100000, help='Number of tasks to seed (e.g. 1000000).')
+        parser.add_argument('--groups', type=int, default=1000, help='Number of groups to spread tasks over.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        # SQLite refuses schema changes inside atomic() unless FK checks are
+        # switched off beforehand; elsewhere this is a no-op.
+        checks_disabled = connection.disable_constraint_checking()
+        try:
+            with transaction.atomic():
+                group, user = self.seed(options['tasks'], options['groups'], options['batch_size'])
+                queries = self.hot_queries(group, user)
+
+                self.stdout.write(self.style.MIGRATE_HEADING('== With indexes =='))
+                self.report(queries)
+
+                with connection.schema_editor() as editor:
+                    for model in self.INDEXED_MODELS:
+                        for index in model._meta.indexes:
+                            editor.remove_index(model, index)
+                self.stdout.write(self.style.MIGRATE_HEADING('== Without indexes =='))
+                self.report(queries)
+                raise Rollback
+        except Rollback:
+            self.stdout.write(self.style.SUCCESS('Rolled back seeded data and index changes.'))
+        finally:
+            if checks_disabled:
+                connection.enable_constraint_checking()
+
+    def seed(self, task_count, group_count, batch_size):
+        started = time.perf_counter()
+        user = User.objects.create(username='explain_seed_user', email='explain@example.com')
+        groups = Group.objects.bulk_create(
+            [Group(groupname=f'Seed group {i}', created_by_userid=user) for i in range(group_count)],
+            batch_size=batch_size,
+        )
+        GroupMember.objects.bulk_create(
+            [GroupMember(group=group, user=user, role='leader') for group in groups],
+            batch_size=batch_size,
+        )
+
+        today = timezone.now().date()
+        statuses = ('todo', 'in_progress', 'done', 'missed')
+        batch = []
+        for i in range(task_count):
+            batch.append(Task(
+                title=f'Seed task {i}',
+                group=groups[i % group_count],
+                created_by_userid=user,
+                status=statuses[i % len(statuses)],
+                due_date=today + timedelta(days=(i % 120) - 60),
+                active=i % 10 != 3,
+            ))
+            if len(batch) >= batch_size:
+                Task.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Task.objects.bulk_create(batch)
+
+        sample_task = Task.objects.filter(group=groups[0]).order_by('id').first()
+        Comment.objects.bulk_create(
+            [Comment(task=sample_task, user=user, content=f'Comment {i}') for i in range(200)],
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        self.stdout.write(f'Seeded {task_count} tasks in {group_count} groups in {time.perf_counter() - started:.1f}s')
+        return groups[0], user
+
+    def hot_queries(self, group, user):
+        today = timezone.now().date()
+        visible = Q(group__isnull=True) | Q(group__active=True)
+        sample_task = Task.objects.filter(group=group).order_by('id').first()
+        return [
+            ('task list ?group=', Task.objects.filter(active=True, group_id=group.id).filter(visible).order_by('id')),
+            ('task list ?group=&status=', Task.objects.filter(active=True, group_id=group.id, status='todo').filter(visible).order_by('id')),
+            ('own tasks', Task.objects.filter(active=True, created_by_userid=user, group__isnull=True).order_by('id')),
+            ('check_deadlines missed', Task.objects.filter(due_date__lt=today, active=True).exclude(status__in=['done', 'archived', 'missed'])),
+            ('check_deadlines upcoming', Task.objects.filter(due_date=today + timedelta(days=1), active=True, status__in=['todo', 'in_progress', 'missed'])),
+            ('comments of task', Comment.objects.filter(active=True, task_id=sample_task.id).order_by('-created_at')),
+            ('membership lookup', GroupMember.objects.filter(group=group, user=user)),
+        ]
+
+    def report(self, queries):
+        for label, queryset in queries:
+            started = time.perf_counter()
+            rows = len(list(queryset.values_list('pk', flat=True)))
+            elapsed = (time.perf_counter() - started) * 1000
+            self.stdout.write(self.style.NOTICE(f'{label}: {rows} rows in {elapsed:.1f} ms'))
+            for line in queryset.explain().splitlines():
+                self.stdout.write(f'    {line}')
@@ -0,0 +1,22 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from Calentasker.thumbnails import THUMBNAILED_FIELDS, generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Generates missing or outdated thumbnails for task, group and profile pictures.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate every image, not just outdated ones.')
+
+    def handle(self, *args, **options):
+        for model_label, field_name, thumbnails_field in THUMBNAILED_FIELDS:
+            model = apps.get_model(model_label)
+            rows = model.objects.exclude(**{f'{field_name}__isnull': True}).exclude(**{field_name: ''})
+            count = 0
+            for pk, name, recorded in rows.values_list('pk', field_name, thumbnails_field).iterator():
+                if options['force'] or (recorded or {}).get('source') != name:
+                    generate_thumbnails(model_label, pk, field_name, thumbnails_field)
+                    count += 1
+            self.stdout.write(f'{model_label}: {count} image(s) processed.')
+        self.stdout.write(self.style.SUCCESS('Thumbnails up to date.'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from tasks import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the task full-text search index (e.g. after raw SQL imports).'
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stdout.write(self.style.WARNING('No full-text index on this database backend; nothing to do.'))
+            return
+        with transaction.atomic():
+            search.index_tasks()
+        self.stdout.write(self.style.SUCCESS('Task search index rebuilt.'))
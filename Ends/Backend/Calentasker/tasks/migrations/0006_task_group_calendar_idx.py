@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0006_alter_groupmember_role'),
+        ('tasks', '0005_comment_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['group', 'active', 'start_date', 'due_date'], name='task_group_calendar_idx'),
+        ),
+    ]
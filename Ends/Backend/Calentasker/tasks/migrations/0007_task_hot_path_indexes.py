@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0007_groupmember_unique_group_member'),
+        ('tasks', '0006_task_group_calendar_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('active', True)), fields=['task', '-created_at'], name='comment_active_task_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('active', True)), fields=['group', 'status'], name='task_active_group_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('active', True)), fields=['status'], name='task_active_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('active', True)), fields=['created_by_userid', 'group'], name='task_active_creator_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('active', True)), fields=['due_date', 'status'], name='task_active_due_status_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from tasks import search
+
+
+def create_search_index(apps, schema_editor):
+    search.create_index(schema_editor)
+    search.index_tasks(using=schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    search.drop_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_sync_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:01
+
+import os
+from collections import Counter
+
+import Calentasker.storage
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def count_existing_references(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    Attachments = apps.get_model('tasks', 'Attachments')
+    Blob = apps.get_model('tasks', 'Blob')
+
+    counts = Counter(name for name in Task.objects.values_list('image', flat=True) if name)
+    for attachment in Attachments.objects.only('file').iterator():
+        if attachment.file.name:
+            counts[attachment.file.name] += 1
+            attachment.filename = os.path.basename(attachment.file.name)
+            attachment.save(update_fields=['filename'])
+    Blob.objects.bulk_create([Blob(name=name, refcount=count) for name, count in counts.items()], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_task_image_thumbnails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('refcount', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='attachments',
+            name='filename',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='attachments',
+            name='file',
+            field=models.FileField(storage=Calentasker.storage.ContentAddressedStorage(), upload_to='attachments/'),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=Calentasker.storage.ContentAddressedStorage(), upload_to='task_images/'),
+        ),
+        migrations.RunPython(count_existing_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0012_attachment_upload'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assigned',
+            index=models.Index(fields=['user', 'task'], name='assigned_user_task_idx'),
+        ),
+    ]
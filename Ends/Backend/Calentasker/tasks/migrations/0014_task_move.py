@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:43
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0012_remove_group_overdue_task_count'),
+        ('tasks', '0013_assigned_user_task_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskMove',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('moved_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('group', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='groups.group')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='moves', to='tasks.task')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['group', 'moved_at'], name='taskmove_group_moved_idx')],
+            },
+        ),
+    ]
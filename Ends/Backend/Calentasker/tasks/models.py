@@ -1,6 +1,40 @@
+import os
+import uuid
+
 from django.db import models
+from django.db.models import DEFERRED
 from django.core.validators import URLValidator
 from django.utils import timezone
+from Calentasker.storage import content_addressed_storage
+from groups.models import Group
+
+UNFINISHED_STATUSES = ('todo', 'in_progress', 'missed')
+# Fields Task.counted_in() reads
+COUNTED_FIELDS = ('active', 'group_id', 'status', 'priority')
+
+
+def task_counter_conditions():
+    """Group counter field -> condition on an active task; mirrors Task.counted_in()."""
+    unfinished = models.Q(status__in=UNFINISHED_STATUSES)
+    return {
+        'open_task_count': models.Q(status__in=('todo', 'in_progress')),
+        'done_task_count': models.Q(status='done'),
+        'missed_task_count': models.Q(status='missed'),
+        **{
+            f'{priority}_priority_task_count': unfinished & models.Q(priority=priority)
+            for priority, _ in Task.PRIORITY_CHOICES
+        },
+    }
+
+
+def overdue_q(today):
+    """
+    Active unfinished tasks due before `today`. Counted when read, not kept
+    on Group: the set changes at midnight without any task being saved.
+    Matches task_active_due_status_idx.
+    """
+    return models.Q(active=True, status__in=UNFINISHED_STATUSES, due_date__lt=today)
+
 
 class Task(models.Model):
     PRIORITY_CHOICES = (
@@ -56,19 +90,106 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     imageUrl = models.TextField(validators=[URLValidator()], blank=True, null=True)
-    image = models.ImageField(upload_to='task_images/', blank=True, null=True)
+    image = models.ImageField(upload_to='task_images/', storage=content_addressed_storage, blank=True, null=True)
+    # Resized copies of image, filled in after upload (Calentasker/thumbnails.py)
+    image_thumbnails = models.JSONField(default=dict, blank=True, editable=False)
     active = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            # Calendar window lookups: /api/tasks/calendar/
+            models.Index(fields=['group', 'active', 'start_date', 'due_date'], name='task_group_calendar_idx'),
+            # Board listings: ?group=, ?status=, own tasks (?created_by_userid=&group__isnull=)
+            models.Index(fields=['group', 'status'], condition=models.Q(active=True), name='task_active_group_status_idx'),
+            models.Index(fields=['status'], condition=models.Q(active=True), name='task_active_status_idx'),
+            models.Index(fields=['created_by_userid', 'group'], condition=models.Q(active=True), name='task_active_creator_idx'),
+            # check_deadlines: due_date range + status
+            models.Index(fields=['due_date', 'status'], condition=models.Q(active=True), name='task_active_due_status_idx'),
+            # Delta sync (/api/tasks/sync/): changes since a watermark, tombstones included
+            models.Index(fields=['group', 'updated_at'], name='task_group_updated_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
-    def save(self, *args, **kwargs):
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Blob referenced when loaded; see tasks.blobs.track_references
+        instance._stored_image = instance.__dict__.get('image') or None
+        # None when loaded with .only()/.defer(); save() then recounts the group
+        loaded = all(field in instance.__dict__ for field in COUNTED_FIELDS)
+        instance._stored_counters = instance.counted_in() if loaded else None
+        # Group moves are logged for sync tombstones, see TaskMove
+        instance._loaded_group_id = instance.__dict__.get('group_id', DEFERRED)
+        return instance
+
+    def counted_in(self):
+        """(group id, Group counter fields this task adds one to)."""
+        if not self.active or self.group_id is None:
+            return None, frozenset()
+        counters = set()
+        if self.status in ('todo', 'in_progress'):
+            counters.add('open_task_count')
+        elif self.status in ('done', 'missed'):
+            counters.add(f'{self.status}_task_count')
+        if self.status in UNFINISHED_STATUSES:
+            counters.add(f'{self.priority}_priority_task_count')
+        return self.group_id, frozenset(counters)
+
+    def sync_completed_at(self):
+        """Stamps/clears completed_at for the current status; bulk writes call it directly."""
         if self.status == 'done' and not self.completed_at:
             self.completed_at = timezone.now()
         elif self.status != 'done' and self.completed_at:
              # Optional: Clear completed_at if status changes back from done
              self.completed_at = None
+
+    def save(self, *args, **kwargs):
+        self.sync_completed_at()
         super().save(*args, **kwargs)
+        self.update_group_counters()
+        self.record_move()
+
+    def record_move(self):
+        loaded = getattr(self, '_loaded_group_id', DEFERRED)
+        if loaded is not DEFERRED and loaded != self.group_id:
+            TaskMove.objects.create(task=self, group_id=loaded)
+        self._loaded_group_id = self.group_id
+
+    def update_group_counters(self):
+        # Unsaved tasks count nowhere yet; soft deletes come through here too
+        before = getattr(self, '_stored_counters', (None, frozenset()))
+        after = self.counted_in()
+        if before is None:
+            Group.recompute_task_counters({self.group_id} - {None})
+        elif before != after:
+            Group.adjust_task_counters(before, after)
+        self._stored_counters = after
+
+class TaskMove(models.Model):
+    """
+    A task leaving `group` (null: the creator's personal tasks). Boards
+    synced with ?group= no longer see the task, so /api/tasks/sync/ sends
+    them a tombstone for it from these rows.
+    """
+    task = models.ForeignKey(
+        Task,
+        on_delete=models.CASCADE,
+        related_name='moves',
+    )
+    group = models.ForeignKey(
+        'groups.Group',
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='+',
+    )
+    moved_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['group', 'moved_at'], name='taskmove_group_moved_idx'),
+        ]
 
 class Assigned(models.Model):
     task = models.ForeignKey(
@@ -83,6 +204,12 @@ class Assigned(models.Model):
     )
     assigned_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # /api/tasks/mine/: the caller's assignments
+            models.Index(fields=['user', 'task'], name='assigned_user_task_idx'),
+        ]
+
 class Attachments(models.Model):
     task = models.ForeignKey(
         Task,
@@ -94,9 +221,41 @@ class Attachments(models.Model):
         on_delete=models.SET_NULL,
         null=True,
     )
-    file = models.FileField(upload_to='attachments/')
+    file = models.FileField(upload_to='attachments/', storage=content_addressed_storage)
+    # Name as uploaded; the stored file is named after its content
+    filename = models.CharField(max_length=255, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_file = instance.__dict__.get('file') or None
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self.file and not self.file._committed:
+            self.filename = os.path.basename(self.file.name)
+        super().save(*args, **kwargs)
+
+class AttachmentUpload(models.Model):
+    """
+    A chunked attachment upload in progress (see tasks.uploads). The bytes
+    received so far are in a staging file whose size is the resume offset.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    task = models.ForeignKey(
+        Task,
+        on_delete=models.CASCADE,
+        related_name='uploads',
+    )
+    uploaded_by_userid = models.ForeignKey(
+        'users.User',
+        on_delete=models.CASCADE,
+    )
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
 class Comment(models.Model):
     task = models.ForeignKey(
         Task,
@@ -111,4 +270,25 @@ class Comment(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    active = models.BooleanField(default=True)
\ No newline at end of file
+    active = models.BooleanField(default=True)
+
+    class Meta:
+        indexes = [
+            # CommentViewSet: active comments of a task, newest first
+            models.Index(fields=['task', '-created_at'], condition=models.Q(active=True), name='comment_active_task_idx'),
+            models.Index(fields=['updated_at'], name='comment_updated_idx'),
+        ]
+
+class Blob(models.Model):
+    """
+    A file in content_addressed_storage and the number of rows
+    (Attachments.file, Task.image) that point at it. Maintained by
+    tasks.blobs; unreferenced blobs are removed by collect_blobs.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    refcount = models.IntegerField(default=0)
+    # Last reference change; orphans are only collected after a grace period
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return self.name
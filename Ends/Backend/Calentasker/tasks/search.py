@@ -0,0 +1,164 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+# One row per task: title, description and the text of its active comments.
+# SQLite: FTS5 virtual table keyed by rowid = task id.
+# PostgreSQL: weighted tsvector per task with a GIN index.
+SEARCH_TABLE = 'tasks_task_search'
+MAX_TERMS = 8
+# Task fields copied into the index; saves limited to other fields skip it
+INDEXED_FIELDS = frozenset(('title', 'description'))
+
+SQLITE_SCHEMA = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+    f"USING fts5(title, description, comments, tokenize = 'unicode61 remove_diacritics 2')",
+)
+POSTGRES_SCHEMA = (
+    f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+    f"task_id bigint PRIMARY KEY REFERENCES tasks_task (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+    f"document tsvector NOT NULL)",
+    f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_gin ON {SEARCH_TABLE} USING gin (document)",
+)
+
+COMMENT_TEXT = {
+    'sqlite': "SELECT group_concat(c.content, ' ') FROM tasks_comment c WHERE c.task_id = t.id AND c.active",
+    'postgresql': "SELECT string_agg(c.content, ' ') FROM tasks_comment c WHERE c.task_id = t.id AND c.active",
+}
+
+
+def is_supported():
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def _config():
+    return getattr(settings, 'TASK_SEARCH_CONFIG', 'simple')
+
+
+def create_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_SCHEMA, 'postgresql': POSTGRES_SCHEMA}.get(vendor, ())
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_index(schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+def index_tasks(task_ids=None, using=connection):
+    """
+    (Re)builds the search rows of `task_ids`, or of every task when None.
+    Called from the Task/Comment signals and after bulk writes.
+    """
+    if using.vendor not in ('sqlite', 'postgresql'):
+        return
+    if task_ids is not None:
+        task_ids = list(task_ids)
+        if not task_ids:
+            return
+    where, params = ('', [])
+    if task_ids is not None:
+        where = f"WHERE t.id IN ({', '.join(['%s'] * len(task_ids))})"
+        params = task_ids
+    comments = COMMENT_TEXT[using.vendor]
+
+    with using.cursor() as cursor:
+        if using.vendor == 'sqlite':
+            delete_where = where.replace('t.id', 'rowid')
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} {delete_where}", params)
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, title, description, comments) "
+                f"SELECT t.id, t.title, t.description, COALESCE(({comments}), '') FROM tasks_task t {where}",
+                params,
+            )
+        else:
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (task_id, document) "
+                f"SELECT t.id, "
+                f"setweight(to_tsvector(%s::regconfig, t.title), 'A') || "
+                f"setweight(to_tsvector(%s::regconfig, t.description), 'B') || "
+                f"setweight(to_tsvector(%s::regconfig, COALESCE(({comments}), '')), 'C') "
+                f"FROM tasks_task t {where} "
+                f"ON CONFLICT (task_id) DO UPDATE SET document = EXCLUDED.document",
+                [_config()] * 3 + params,
+            )
+
+
+def unindex_task(task_id):
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [task_id])
+    # PostgreSQL rows go with the task through ON DELETE CASCADE
+
+
+def parse_terms(query):
+    """Word tokens of the user's query; each one is matched as a prefix."""
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def _search_task_ids_unindexed(terms, group_ids, user_id, limit, offset):
+    # Other backends: unranked LIKE scan, newest first
+    from .models import Task
+
+    queryset = Task.objects.filter(active=True).filter(
+        Q(group__isnull=True) | Q(group__active=True)
+    ).filter(
+        Q(group_id__in=group_ids) | Q(group__isnull=True, created_by_userid=user_id)
+    )
+    for term in terms:
+        queryset = queryset.filter(
+            Q(title__icontains=term) | Q(description__icontains=term) |
+            Q(comments__content__icontains=term, comments__active=True)
+        )
+    queryset = queryset.distinct().order_by('-updated_at', 'id').values_list('id', flat=True)
+    return list(queryset[offset:offset + limit])
+
+
+def search_task_ids(query, group_ids, user_id, limit, offset=0):
+    """
+    Ranked ids of active tasks matching every term of `query`, limited to
+    active `group_ids` and the user's own personal tasks.
+    """
+    terms = parse_terms(query)
+    if not terms:
+        return []
+    if not is_supported():
+        return _search_task_ids_unindexed(terms, list(group_ids), user_id, limit, offset)
+
+    scope = ["t.active", "(g.id IS NULL OR g.active)"]
+    scope_params = []
+    group_ids = list(group_ids)
+    if group_ids:
+        scope.append(
+            f"(t.group_id IN ({', '.join(['%s'] * len(group_ids))}) "
+            f"OR (t.group_id IS NULL AND t.created_by_userid_id = %s))"
+        )
+        scope_params += group_ids + [user_id]
+    else:
+        scope.append("t.group_id IS NULL AND t.created_by_userid_id = %s")
+        scope_params.append(user_id)
+    scope = ' AND '.join(scope)
+    joins = "JOIN tasks_task t ON t.id = {key} LEFT JOIN groups_group g ON g.id = t.group_id"
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            match = ' '.join(f'"{term}"*' for term in terms)
+            cursor.execute(
+                f"SELECT t.id FROM {SEARCH_TABLE} {joins.format(key=SEARCH_TABLE + '.rowid')} "
+                f"WHERE {SEARCH_TABLE} MATCH %s AND {scope} "
+                f"ORDER BY bm25({SEARCH_TABLE}, 10.0, 4.0, 1.0), t.id LIMIT %s OFFSET %s",
+                [match] + scope_params + [limit, offset],
+            )
+        else:
+            tsquery = ' & '.join(f"{term}:*" for term in terms)
+            cursor.execute(
+                f"SELECT t.id FROM {SEARCH_TABLE} s {joins.format(key='s.task_id')} "
+                f"WHERE s.document @@ to_tsquery(%s::regconfig, %s) AND {scope} "
+                f"ORDER BY ts_rank(s.document, to_tsquery(%s::regconfig, %s)) DESC, t.id LIMIT %s OFFSET %s",
+                [_config(), tsquery] + scope_params + [_config(), tsquery, limit, offset],
+            )
+        return [row[0] for row in cursor.fetchall()]
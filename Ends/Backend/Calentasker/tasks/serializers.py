@@ -1,14 +1,20 @@
+import os
+
+from django.conf import settings
 from rest_framework import serializers
 from .models import (
     Task, 
     Assigned, 
     Attachments, 
+    AttachmentUpload,
     Comment
 )
 from groups.models import Group
 from users.serializers import UserListSerializer
 from groups.serializers import GroupSerializer
 from users.models import User
+from Calentasker.thumbnails import ThumbnailURLsField
+from .uploads import received
 
 
 class TaskSummarySerializer(serializers.ModelSerializer):
@@ -17,6 +23,7 @@ class TaskSummarySerializer(serializers.ModelSerializer):
     """
     created_by = UserListSerializer(source='created_by_userid', read_only=True)
     assigned_to = UserListSerializer(source='assigned_to_userid', read_only=True)
+    image_thumbnails = ThumbnailURLsField()
     
     class Meta:
         model = Task
@@ -25,10 +32,83 @@ class TaskSummarySerializer(serializers.ModelSerializer):
             'start_date', 'due_date', 'completed_at',
             'created_at', 'updated_at', 'active',
             'group', 'created_by', 'assigned_to',
-            'imageUrl', 'image',
+            'imageUrl', 'image', 'image_thumbnails',
         )
 
-class CommentSerializer(serializers.ModelSerializer):
+class TaskScopedSerializerMixin:
+    """
+    Drops task_detail when the view is scoped to a single task
+    (context['task_scoped']), since every row would repeat the same summary.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.context.get('task_scoped'):
+            self.fields.pop('task_detail', None)
+
+class TaskCalendarSerializer(serializers.ModelSerializer):
+    """
+    Slim projection used by the calendar window endpoint.
+    """
+    assignee_ids = serializers.SerializerMethodField()
+
+    def get_assignee_ids(self, obj):
+        return [assignment.user_id for assignment in obj.assignments.all()]
+
+    class Meta:
+        model = Task
+        fields = (
+            'id', 'title', 'status', 'priority',
+            'start_date', 'due_date', 'completed_at', 'created_at',
+            'group', 'assigned_to_userid', 'assignee_ids',
+        )
+        read_only_fields = fields
+
+class TaskCompactSerializer(serializers.ModelSerializer):
+    """
+    List projection with ids in place of nested group/user objects; the
+    referenced rows are side-loaded through get_included().
+    """
+    created_by = serializers.PrimaryKeyRelatedField(source='created_by_userid', read_only=True)
+    assigned_to = serializers.PrimaryKeyRelatedField(source='assigned_to_userid', read_only=True)
+    assignee_ids = serializers.SerializerMethodField()
+    comments = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    attachments = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    image_thumbnails = ThumbnailURLsField()
+
+    def get_assignee_ids(self, obj):
+        return [assignment.user_id for assignment in obj.assignments.all()]
+
+    class Meta:
+        model = Task
+        fields = (
+            'id', 'title', 'description', 'priority', 'status',
+            'start_date', 'due_date', 'completed_at',
+            'created_at', 'updated_at', 'active',
+            'group', 'created_by', 'assigned_to', 'assignee_ids',
+            'comments', 'attachments',
+            'imageUrl', 'image', 'image_thumbnails',
+        )
+        read_only_fields = fields
+
+def get_included(tasks, context=None):
+    """
+    Serializes every group and user referenced by `tasks` exactly once,
+    keyed by id: {"groups": {id: ...}, "users": {id: ...}}.
+    """
+    group_ids = {task.group_id for task in tasks if task.group_id}
+    user_ids = set()
+    for task in tasks:
+        user_ids.update(filter(None, (task.created_by_userid_id, task.assigned_to_userid_id)))
+        user_ids.update(assignment.user_id for assignment in task.assignments.all())
+
+    groups = Group.objects.select_related('created_by_userid').in_bulk(group_ids) if group_ids else {}
+    users = User.objects.in_bulk(user_ids) if user_ids else {}
+    return {
+        'groups': {pk: GroupSerializer(group, context=context).data for pk, group in groups.items()},
+        'users': {pk: UserListSerializer(user, context=context).data for pk, user in users.items()},
+    }
+
+class CommentSerializer(TaskScopedSerializerMixin, serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(
         queryset = User.objects.all(),
         write_only = True,
@@ -68,7 +148,7 @@ class CommentSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('created_at', 'user_detail', 'task_detail', 'active',)
 
-class AttachmentsSerializer(serializers.ModelSerializer):
+class AttachmentsSerializer(TaskScopedSerializerMixin, serializers.ModelSerializer):
     task = serializers.PrimaryKeyRelatedField(
         queryset = Task.objects.all(),
         write_only = True,
@@ -95,11 +175,36 @@ class AttachmentsSerializer(serializers.ModelSerializer):
             'uploaded_by_userid', 
             'uploaded_by_detail',
             'file', 
+            'filename',
             'uploaded_at',
         )
-        read_only_fields = ('uploaded_at', 'uploaded_by_detail', 'task_detail',)
+        read_only_fields = ('filename', 'uploaded_at', 'uploaded_by_detail', 'task_detail',)
+
+class AttachmentUploadSerializer(serializers.ModelSerializer):
+    task = serializers.PrimaryKeyRelatedField(queryset=Task.objects.filter(active=True))
+    offset = serializers.SerializerMethodField()
+
+    def get_offset(self, obj):
+        return received(obj)
+
+    def validate_filename(self, value):
+        value = os.path.basename(value.replace('\\', '/')).strip()
+        if not value:
+            raise serializers.ValidationError('A file name is required.')
+        return value
+
+    def validate_size(self, value):
+        limit = getattr(settings, 'ATTACHMENT_UPLOAD_MAX_SIZE', 1024 ** 3)
+        if value > limit:
+            raise serializers.ValidationError(f'Attachments are limited to {limit} bytes.')
+        return value
+
+    class Meta:
+        model = AttachmentUpload
+        fields = ('id', 'task', 'filename', 'size', 'offset', 'created_at')
+        read_only_fields = ('id', 'offset', 'created_at')
 
-class AssignedSerializer(serializers.ModelSerializer):
+class AssignedSerializer(TaskScopedSerializerMixin, serializers.ModelSerializer):
     task = serializers.PrimaryKeyRelatedField(
         queryset = Task.objects.all(),
         write_only = True,
@@ -148,6 +253,7 @@ class TaskSerializer(serializers.ModelSerializer):
 
     comments = serializers.PrimaryKeyRelatedField(many = True, read_only = True)
     attachments = serializers.PrimaryKeyRelatedField(many = True, read_only = True)
+    image_thumbnails = ThumbnailURLsField()
     class Meta:
         model = Task
         fields = (
@@ -161,7 +267,7 @@ class TaskSerializer(serializers.ModelSerializer):
             'assigned_to_userid',
             'assignee_ids',
             'assignments', 'comments', 'attachments',
-            'imageUrl', 'image',
+            'imageUrl', 'image', 'image_thumbnails',
         )
         read_only_fields = ('group_detail', 'created_at', 'updated_at', 'completed_at', 'active',)
         extra_kwargs = {
@@ -191,4 +297,25 @@ class TaskSerializer(serializers.ModelSerializer):
             except User.DoesNotExist:
                 pass
                 
-        return task
\ No newline at end of file
+        return task
+
+class TaskBulkItemSerializer(serializers.ModelSerializer):
+    """
+    One entry of a /api/tasks/bulk/ payload. Related rows are plain ids, so
+    validating a whole batch runs no queries; the view resolves them in bulk.
+    """
+    id = serializers.IntegerField(required=False)
+    group = serializers.IntegerField(required=False, allow_null=True)
+    created_by_userid = serializers.IntegerField(required=False)
+    assigned_to_userid = serializers.IntegerField(required=False, allow_null=True)
+    assignee_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+    class Meta:
+        model = Task
+        fields = (
+            'id', 'title', 'description', 'priority', 'status',
+            'start_date', 'due_date',
+            'group', 'created_by_userid', 'assigned_to_userid', 'assignee_ids',
+            'imageUrl',
+        )
+
@@ -0,0 +1,63 @@
+from django.db.models import DEFERRED
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from Calentasker.events import publish_on_commit
+from Calentasker.thumbnails import schedule_thumbnails
+from . import blobs, search
+from groups.models import Group
+from .models import Task, Assigned, Attachments, Comment
+
+
+def _event(kind, instance, created=None, **extra):
+    action = 'deleted' if created is None else ('created' if created else 'updated')
+    return {'type': f'{kind}.{action}', 'id': instance.pk, **extra}
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is None or not search.INDEXED_FIELDS.isdisjoint(update_fields):
+        search.index_tasks([instance.pk])
+    if update_fields is None or 'image' in update_fields:
+        schedule_thumbnails(instance, 'image', 'image_thumbnails')
+        blobs.track_references(instance, 'image')
+    publish_on_commit(instance.group_id, _event('task', instance, created))
+    # Still the group the task was loaded from; Task.record_move runs after this
+    previous = getattr(instance, '_loaded_group_id', DEFERRED)
+    if previous is not DEFERRED and previous != instance.group_id:
+        publish_on_commit(previous, _event('task', instance, created))
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    search.unindex_task(instance.pk)
+    if instance.image:
+        blobs.drop_reference(instance.image.name)
+    Group.adjust_task_counters(getattr(instance, '_stored_counters', None) or instance.counted_in(), (None, ()))
+    publish_on_commit(instance.group_id, _event('task', instance))
+
+
+@receiver(post_save, sender=Assigned)
+@receiver(post_delete, sender=Assigned)
+@receiver(post_save, sender=Attachments)
+@receiver(post_delete, sender=Attachments)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def task_child_changed(sender, instance, created=None, **kwargs):
+    # Tasks are serialized with their child ids, so the task's updated_at
+    # (and with it the list ETag) has to move when a child changes.
+    Task.objects.filter(pk=instance.task_id).update(updated_at=timezone.now())
+    if sender is Comment:
+        search.index_tasks([instance.task_id])
+    elif sender is Attachments:
+        if created is None:
+            blobs.drop_reference(instance.file.name)
+        else:
+            blobs.track_references(instance, 'file')
+
+    if sender.task.is_cached(instance):
+        group_id = instance.task.group_id
+    else:
+        group_id = Task.objects.filter(pk=instance.task_id).values_list('group_id', flat=True).first()
+    kind = {Assigned: 'assignment', Attachments: 'attachment', Comment: 'comment'}[sender]
+    publish_on_commit(group_id, _event(kind, instance, created, task=instance.task_id))
@@ -1,3 +1,1144 @@
-from django.test import TestCase
+import base64
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from PIL import Image
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework import status
+from Calentasker import thumbnails
+from users.models import User
+from groups.models import Group, GroupMember
+from tasks import blobs, uploads
+from tasks.models import Task, Assigned, Attachments, AttachmentUpload, Blob, Comment
+
+
+class TaskListQueryCountTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner', password='password')
+        self.other = User.objects.create_user(username='helper', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.group = Group.objects.create(groupname='Board', created_by_userid=self.user)
+        GroupMember.objects.create(group=self.group, user=self.user, role='leader')
+
+    def create_tasks(self, count):
+        for i in range(count):
+            task = Task.objects.create(
+                title=f'Task {i}',
+                group=self.group,
+                created_by_userid=self.user,
+                assigned_to_userid=self.other,
+            )
+            Assigned.objects.create(task=task, user=self.user)
+            Assigned.objects.create(task=task, user=self.other)
+            Comment.objects.create(task=task, user=self.user, content='First')
+            Comment.objects.create(task=task, user=self.other, content='Removed', active=False)
+            Attachments.objects.create(task=task, uploaded_by_userid=self.user, file='attachments/file.txt')
+
+    def test_list_query_count_is_constant(self):
+        # ETag validator + 1 task query + assignments, comments and attachments
+        # prefetches, + the caller's memberships until they are cached
+        self.create_tasks(2)
+        with self.assertNumQueries(6):
+            response = self.client.get(f'/api/tasks/?group={self.group.id}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.create_tasks(20)
+        with self.assertNumQueries(5):
+            response = self.client.get(f'/api/tasks/?group={self.group.id}&paginate=false')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 22)
+
+    def test_list_only_includes_active_comments(self):
+        self.create_tasks(1)
+        task = Task.objects.get()
+        response = self.client.get(f'/api/tasks/?group={self.group.id}&paginate=false')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['comments'], [task.comments.get(active=True).id])
+        self.assertEqual(len(response.data[0]['assignments']), 2)
+        self.assertEqual(response.data[0]['assignments'][0]['task_detail']['id'], task.id)
+
+
+class TaskPaginationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='pager', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.tasks = [
+            Task.objects.create(title=f'Task {i}', created_by_userid=self.user)
+            for i in range(5)
+        ]
+
+    def test_tasks_are_cursor_paginated(self):
+        response = self.client.get('/api/tasks/', {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([t['id'] for t in response.data['results']], [t.id for t in self.tasks[:2]])
+        self.assertIsNone(response.data['previous'])
+
+        seen = [t['id'] for t in response.data['results']]
+        next_url = response.data['next']
+        while next_url:
+            response = self.client.get(next_url)
+            seen += [t['id'] for t in response.data['results']]
+            next_url = response.data['next']
+        self.assertEqual(seen, [t.id for t in self.tasks])
+
+    def test_paginate_false_returns_plain_list(self):
+        response = self.client.get('/api/tasks/', {'paginate': 'false'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 5)
+
+    def test_comments_ordered_newest_first(self):
+        task = self.tasks[0]
+        comments = [Comment.objects.create(task=task, user=self.user, content=str(i)) for i in range(3)]
+        response = self.client.get('/api/comments/', {'task': task.id, 'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([c['id'] for c in response.data['results']], [comments[2].id, comments[1].id])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([c['id'] for c in response.data['results']], [comments[0].id])
+
+
+class TaskCalendarTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='planner', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.group = Group.objects.create(groupname='Calendar', created_by_userid=self.user)
+        GroupMember.objects.create(group=self.group, user=self.user, role='leader')
+
+    def create_task(self, title, start=None, due=None):
+        return Task.objects.create(
+            title=title, group=self.group, created_by_userid=self.user,
+            start_date=start, due_date=due,
+        )
+
+    def test_returns_tasks_overlapping_window(self):
+        from datetime import date
+        inside = self.create_task('Inside', date(2026, 3, 5), date(2026, 3, 8))
+        spanning = self.create_task('Spanning', date(2026, 2, 1), date(2026, 4, 30))
+        # Without a start date the interval begins at created_at (today)
+        self.create_task('Due only', due=date(2026, 3, 31))
+        self.create_task('Before', date(2026, 1, 1), date(2026, 2, 27))
+        self.create_task('After', date(2026, 4, 2), date(2026, 4, 9))
+        Assigned.objects.create(task=inside, user=self.user)
+
+        response = self.client.get('/api/tasks/calendar/', {
+            'from': '2026-03-01', 'to': '2026-03-31', 'group': self.group.id,
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(t['id'] for t in response.data),
+            sorted([inside.id, spanning.id]),
+        )
+        row = next(t for t in response.data if t['id'] == inside.id)
+        self.assertEqual(row['assignee_ids'], [self.user.id])
+        self.assertNotIn('group_detail', row)
+
+    def test_undated_task_spans_creation_day(self):
+        from django.utils import timezone
+        undated = self.create_task('Undated')
+        today = timezone.now().date().isoformat()
+        response = self.client.get('/api/tasks/calendar/', {'from': today, 'to': today})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([t['id'] for t in response.data], [undated.id])
+
+    def test_requires_valid_window(self):
+        response = self.client.get('/api/tasks/calendar/', {'from': '2026-03-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/tasks/calendar/', {'from': '2026-03-31', 'to': '2026-03-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/tasks/calendar/', {'from': '2024-02-30', 'to': '2024-03-05'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['detail'], 'from and to are required as YYYY-MM-DD.')
+
+
+class CheckDeadlinesCommandTest(TestCase):
+    def setUp(self):
+        from django.utils import timezone
+        from datetime import timedelta
+        self.user = User.objects.create_user(username='assignee', email='assignee@example.com', password='password')
+        today = timezone.now().date()
+        self.overdue = [
+            Task.objects.create(title=f'Overdue {i}', created_by_userid=self.user, assigned_to_userid=self.user,
+                                due_date=today - timedelta(days=1 + i))
+            for i in range(5)
+        ]
+        self.unassigned = Task.objects.create(title='Unassigned', created_by_userid=self.user, due_date=today - timedelta(days=1))
+        self.done = Task.objects.create(title='Done', created_by_userid=self.user, status='done', due_date=today - timedelta(days=1))
+        self.upcoming = Task.objects.create(title='Tomorrow', created_by_userid=self.user, assigned_to_userid=self.user,
+                                            due_date=today + timedelta(days=1))
+
+    def run_command(self, **options):
+        from io import StringIO
+        from django.core.management import call_command
+        call_command('check_deadlines', stdout=StringIO(), **options)
+
+    def run_mail_worker(self):
+        from io import StringIO
+        from django.core.management import call_command
+        call_command('run_mail_worker', '--once', stdout=StringIO())
+
+    def test_marks_missed_and_notifies_in_batches(self):
+        from django.core import mail
+        before = Task.objects.get(pk=self.overdue[0].pk).updated_at
+        # per batch: select + update (3 batches of 2 rows, then an empty one),
+        # the group counter recount (task counts + groups), the upcoming
+        # select and 3 outbox inserts of 2 notifications each
+        with self.assertNumQueries(3 * 2 + 1 + 2 + 1 + 3):
+            self.run_command(batch_size=2)
+
+        self.assertEqual(Task.objects.filter(status='missed').count(), 6)
+        self.assertEqual(Task.objects.get(pk=self.done.pk).status, 'done')
+        self.assertGreater(Task.objects.get(pk=self.overdue[0].pk).updated_at, before)
+
+        self.assertEqual(mail.outbox, [])
+        self.run_mail_worker()
+        subjects = sorted(message.subject for message in mail.outbox)
+        self.assertEqual(len(subjects), 6)
+        self.assertIn('REMINDER: Tomorrow is due tomorrow', subjects)
+
+    def test_rerun_is_a_no_op(self):
+        from django.core import mail
+        self.run_command()
+        self.run_mail_worker()
+        mail.outbox.clear()
+        self.run_command()
+        self.run_mail_worker()
+        self.assertEqual([m.subject for m in mail.outbox], ['REMINDER: Tomorrow is due tomorrow'])
+
+
+class TaskCompactListTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='compact', password='password')
+        self.other = User.objects.create_user(username='teammate', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.group = Group.objects.create(groupname='Compact', created_by_userid=self.user)
+        GroupMember.objects.create(group=self.group, user=self.user, role='leader')
+
+    def create_tasks(self, count):
+        for i in range(count):
+            task = Task.objects.create(title=f'Task {i}', group=self.group, created_by_userid=self.user,
+                                       assigned_to_userid=self.other)
+            Assigned.objects.create(task=task, user=self.other)
+
+    def test_compact_list_side_loads_groups_and_users(self):
+        self.create_tasks(3)
+        response = self.client.get('/api/tasks/', {'group': self.group.id, 'compact': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        task = response.data['results'][0]
+        self.assertEqual(task['group'], self.group.id)
+        self.assertEqual(task['created_by'], self.user.id)
+        self.assertEqual(task['assignee_ids'], [self.other.id])
+        self.assertNotIn('group_detail', task)
+        # Cursor page keys plus the side-loaded rows
+        self.assertEqual(set(response.data), {'next', 'previous', 'results', 'included'})
+        self.assertEqual(set(response.data['included']), {'groups', 'users'})
+        self.assertEqual(set(response.data['included']['groups']), {self.group.id})
+        self.assertEqual(set(response.data['included']['users']), {self.user.id, self.other.id})
+
+    def test_compact_pages_side_load_their_own_rows(self):
+        self.create_tasks(3)
+        response = self.client.get('/api/tasks/', {'group': self.group.id, 'compact': 'true', 'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([task['title'] for task in response.data['results']], ['Task 2'])
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(set(response.data['included']['users']), {self.user.id, self.other.id})
+
+    def test_compact_list_query_count_is_constant(self):
+        # ETag validator + tasks + 3 prefetches + included groups + included users,
+        # + the caller's memberships until they are cached
+        self.create_tasks(2)
+        with self.assertNumQueries(8):
+            self.client.get('/api/tasks/', {'group': self.group.id, 'compact': 'true', 'paginate': 'false'})
+        self.create_tasks(20)
+        with self.assertNumQueries(7):
+            response = self.client.get('/api/tasks/', {'group': self.group.id, 'compact': 'true', 'paginate': 'false'})
+        self.assertEqual(len(response.data['results']), 22)
+
+    def test_retrieve_keeps_full_nesting(self):
+        self.create_tasks(1)
+        task = Task.objects.get()
+        response = self.client.get(f'/api/tasks/{task.id}/', {'compact': 'true'})
+        self.assertEqual(response.data['group_detail']['id'], self.group.id)
+        self.assertEqual(response.data['created_by']['id'], self.user.id)
+
+
+class TaskChildEndpointQueryCountTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='commenter', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.task = Task.objects.create(title='Busy', created_by_userid=self.user, assigned_to_userid=self.user)
+
+    def create_rows(self, count):
+        for i in range(count):
+            Comment.objects.create(task=self.task, user=self.user, content=f'Comment {i}')
+            Assigned.objects.create(task=self.task, user=self.user)
+            Attachments.objects.create(task=self.task, uploaded_by_userid=self.user, file=f'attachments/{i}.txt')
+
+    def test_task_scoped_lists_skip_task_detail(self):
+        self.create_rows(2)
+        for url in ('/api/comments/', '/api/attachments/', '/api/assignments/'):
+            response = self.client.get(url, {'task': self.task.id, 'paginate': 'false'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data), 2)
+            self.assertNotIn('task_detail', response.data[0])
+
+        response = self.client.get('/api/comments/', {'paginate': 'false'})
+        self.assertEqual(response.data[0]['task_detail']['id'], self.task.id)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        # comments also run their ETag validator
+        queries = {'/api/comments/': 2, '/api/attachments/': 1, '/api/assignments/': 1}
+        self.create_rows(2)
+        for url, count in queries.items():
+            for params in ({'task': self.task.id}, {}):
+                with self.assertNumQueries(count):
+                    self.client.get(url, {'paginate': 'false', **params})
+        self.create_rows(30)
+        for url, count in queries.items():
+            for params in ({'task': self.task.id}, {}):
+                with self.assertNumQueries(count):
+                    response = self.client.get(url, {'paginate': 'false', **params})
+                self.assertEqual(len(response.data), 32)
+
+
+class ConditionalListTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='watcher', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.group = Group.objects.create(groupname='Watched', created_by_userid=self.user)
+        GroupMember.objects.create(group=self.group, user=self.user, role='leader')
+        self.task = Task.objects.create(title='Watched', group=self.group, created_by_userid=self.user)
+        self.url = f'/api/tasks/?group={self.group.id}'
+
+    def assert_not_modified(self, url, etag):
+        # validator only: no task query, no prefetches, no serialization
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_unchanged_task_list_answers_304(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assert_not_modified(self.url, response['ETag'])
+
+    def test_task_list_etag_changes_with_the_board(self):
+        etag = self.client.get(self.url)['ETag']
+        changes = [
+            lambda: Task.objects.create(title='New', group=self.group, created_by_userid=self.user),
+            lambda: Comment.objects.create(task=self.task, user=self.user, content='Hi'),
+            lambda: Assigned.objects.create(task=self.task, user=self.user),
+            lambda: Group.objects.get(pk=self.group.pk).save(),
+        ]
+        for change in changes:
+            change()
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(response['ETag'], etag)
+            etag = response['ETag']
+
+    def test_etags_follow_nested_user_edits(self):
+        helper = User.objects.create_user(username='helper', password='password')
+        Assigned.objects.create(task=self.task, user=helper)
+        Comment.objects.create(task=self.task, user=helper, content='On it')
+        for url in (self.url, f'/api/comments/?task={self.task.id}'):
+            etag = self.client.get(url)['ETag']
+            self.assert_not_modified(url, etag)
+            helper.first_name = f'Renamed for {url}'
+            helper.save()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+
+        # Creator of the task (and the group)
+        etag = self.client.get(self.url)['ETag']
+        self.user.username = 'watcher2'
+        self.user.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_etag_depends_on_query_and_user(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url + '&compact=true', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assert_not_modified(self.url + '&compact=true', response['ETag'])
+
+        other = User.objects.create_user(username='peeker', password='password')
+        self.client.force_authenticate(user=other)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_comment_list_etag_tracks_edits_and_deletes(self):
+        comment = Comment.objects.create(task=self.task, user=self.user, content='First')
+        url = f'/api/comments/?task={self.task.id}'
+        etag = self.client.get(url)['ETag']
+        self.assert_not_modified(url, etag)
+
+        self.client.patch(f'/api/comments/{comment.id}/', {'content': 'Edited'})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        self.client.delete(f'/api/comments/{comment.id}/')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+
+
+@override_settings(SYNC_WATERMARK_MARGIN=0)
+class TaskSyncTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='syncer', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.group = Group.objects.create(groupname='Synced', created_by_userid=self.user)
+        GroupMember.objects.create(group=self.group, user=self.user, role='leader')
+        self.task = Task.objects.create(title='Kept', group=self.group, created_by_userid=self.user)
+        self.doomed = Task.objects.create(title='Doomed', group=self.group, created_by_userid=self.user)
+        self.comment = Comment.objects.create(task=self.task, user=self.user, content='Old')
+
+    def sync(self, **params):
+        response = self.client.get('/api/tasks/sync/', {'group': self.group.id, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_initial_sync_returns_the_board(self):
+        Task.objects.create(title='Long gone', group=self.group, created_by_userid=self.user, active=False)
+        data = self.sync()
+        self.assertEqual({task['id'] for task in data['tasks']}, {self.task.id, self.doomed.id})
+        self.assertEqual([comment['id'] for comment in data['comments']], [self.comment.id])
+        self.assertNotIn('task_detail', data['comments'][0])
+        self.assertEqual(data['deleted'], {'tasks': [], 'comments': []})
+
+    def test_delta_returns_changes_and_tombstones(self):
+        watermark = self.sync()['watermark']
+        self.assertEqual(self.sync(updated_since=watermark)['tasks'], [])
+
+        self.client.delete(f'/api/tasks/{self.doomed.id}/')
+        self.client.delete(f'/api/comments/{self.comment.id}/')
+        new_comment = Comment.objects.create(task=self.task, user=self.user, content='New')
+
+        data = self.sync(updated_since=watermark)
+        # the task is re-sent because its comments changed
+        self.assertEqual([task['id'] for task in data['tasks']], [self.task.id])
+        self.assertEqual([comment['id'] for comment in data['comments']], [new_comment.id])
+        self.assertEqual(data['deleted'], {'tasks': [self.doomed.id], 'comments': [self.comment.id]})
+
+        data = self.sync(updated_since=data['watermark'])
+        self.assertEqual((data['tasks'], data['comments']), ([], []))
+        self.assertEqual(data['deleted'], {'tasks': [], 'comments': []})
+
+    def test_watermark_leaves_a_margin_for_open_transactions(self):
+        with override_settings(SYNC_WATERMARK_MARGIN=60):
+            watermark = self.sync()['watermark']
+        # Stamped before the watermark was taken, committed after
+        Task.objects.filter(pk=self.task.pk).update(updated_at=timezone.now() - timedelta(seconds=1))
+        self.assertIn(self.task.id, [task['id'] for task in self.sync(updated_since=watermark)['tasks']])
+
+    def test_tasks_moved_off_the_board_get_tombstones(self):
+        other = Group.objects.create(groupname='Elsewhere', created_by_userid=self.user)
+        watermark = self.sync()['watermark']
+        moved = Task.objects.get(pk=self.doomed.pk)
+        moved.group = other
+        moved.save()
+        bulk_moved = Task.objects.create(title='Bulk', group=self.group, created_by_userid=self.user)
+        GroupMember.objects.create(group=other, user=self.user, role='leader')
+        self.client.post('/api/tasks/bulk/', {'update': [{'id': bulk_moved.id, 'group': None}]}, format='json')
+
+        data = self.sync(updated_since=watermark)
+        self.assertEqual(data['deleted']['tasks'], sorted([moved.id, bulk_moved.id]))
+        self.assertEqual([task['id'] for task in data['tasks']], [])
+        # The board the task arrived on just sees an update
+        response = self.client.get('/api/tasks/sync/', {'group': other.id, 'updated_since': watermark})
+        self.assertEqual([task['id'] for task in response.data['tasks']], [moved.id])
+        self.assertEqual(response.data['deleted']['tasks'], [])
+
+        # Moved back: no longer a tombstone
+        moved.group = self.group
+        moved.save()
+        self.assertEqual(self.sync(updated_since=watermark)['deleted']['tasks'], [bulk_moved.id])
+
+    def test_invalid_watermark_is_rejected(self):
+        response = self.client.get('/api/tasks/sync/', {'updated_since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/tasks/sync/', {'updated_since': '2024-02-30T10:00:00'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TaskBulkTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='planner', password='password')
+        self.reader = User.objects.create_user(username='viewer', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.group = Group.objects.create(groupname='Sprint', created_by_userid=self.user)
+        self.next_group = Group.objects.create(groupname='Next sprint', created_by_userid=self.user)
+        GroupMember.objects.create(group=self.group, user=self.user, role='leader')
+        GroupMember.objects.create(group=self.next_group, user=self.user, role='operator')
+        GroupMember.objects.create(group=self.group, user=self.reader, role='reader')
+
+    def bulk(self, payload):
+        return self.client.post('/api/tasks/bulk/', payload, format='json')
+
+    def test_create_update_and_delete_in_one_request(self):
+        moved = Task.objects.create(title='Move me', group=self.group, created_by_userid=self.user)
+        finished = Task.objects.create(title='Finish me', group=self.group, created_by_userid=self.user)
+        doomed = Task.objects.create(title='Drop me', group=self.group, created_by_userid=self.user)
+
+        response = self.bulk({
+            'create': [{'title': 'New', 'group': self.group.id, 'assignee_ids': [self.reader.id, self.user.id]}],
+            'update': [{'id': moved.id, 'group': self.next_group.id}, {'id': finished.id, 'status': 'done'}],
+            'delete': [doomed.id],
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        created = Task.objects.get(pk=response.data['created'][0]['id'])
+        self.assertEqual(created.created_by_userid, self.user)
+        self.assertEqual(created.assigned_to_userid, self.reader)
+        self.assertEqual(created.assignments.count(), 2)
+        self.assertEqual(Task.objects.get(pk=moved.pk).group, self.next_group)
+        finished.refresh_from_db()
+        self.assertIsNotNone(finished.completed_at)
+        self.assertGreater(finished.updated_at, moved.updated_at)
+        self.assertFalse(Task.objects.get(pk=doomed.pk).active)
+        self.assertEqual(response.data['deleted'], [doomed.id])
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        def payload(count):
+            tasks = [Task.objects.create(title=f'Old {i}', group=self.group, created_by_userid=self.user)
+                     for i in range(count)]
+            return {
+                'create': [{'title': f'New {i}', 'group': self.group.id, 'assignee_ids': [self.reader.id]}
+                           for i in range(count)],
+                'update': [{'id': task.id, 'status': 'in_progress'} for task in tasks],
+            }
+
+        small, large = payload(2), payload(40)
+        # memberships are cached after the first request
+        self.bulk(payload(1))
+        with CaptureQueriesContext(connection) as small_queries:
+            self.bulk(small)
+        with CaptureQueriesContext(connection) as large_queries:
+            response = self.bulk(large)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(small_queries), len(large_queries))
+
+    def test_role_is_checked_per_group(self):
+        task = Task.objects.create(title='Shared', group=self.group, created_by_userid=self.user)
+        self.client.force_authenticate(user=self.reader)
+
+        response = self.bulk({'update': [{'id': task.id, 'title': 'Renamed'}]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        for payload in ({'create': [{'title': 'Nope', 'group': self.group.id}]}, {'delete': [task.id]}):
+            response = self.bulk(payload)
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(Task.objects.get(pk=task.pk).active)
+
+    def test_moving_out_of_a_group_needs_the_manager_role(self):
+        task = Task.objects.create(title='Shared', group=self.group, created_by_userid=self.user)
+        self.client.force_authenticate(user=self.reader)
+        for payload in (
+            {'update': [{'id': task.id, 'group': None}]},
+            {'create': [{'title': 'Gift', 'group': None, 'created_by_userid': self.user.id}]},
+        ):
+            response = self.bulk(payload)
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN, payload)
+        self.assertEqual(Task.objects.get(pk=task.pk).group, self.group)
+
+        self.client.force_authenticate(user=self.user)
+        response = self.bulk({'update': [{'id': task.id, 'group': None}]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(Task.objects.get(pk=task.pk).group)
+
+    def test_response_ignores_list_filters(self):
+        task = Task.objects.create(title='Filtered', group=self.group, created_by_userid=self.user)
+        response = self.client.post(
+            f'/api/tasks/bulk/?group={self.next_group.id}&status=todo',
+            {'update': [{'id': task.id, 'status': 'done'}]}, format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data['updated']], [task.id])
+
+    def test_invalid_entry_rolls_back_nothing_written(self):
+        response = self.bulk({
+            'create': [{'title': 'Fine', 'group': self.group.id}, {'group': self.group.id}],
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('title', response.data['create'][1])
+        self.assertFalse(Task.objects.exists())
+
+
+class TaskSearchTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='seeker', password='password')
+        self.stranger = User.objects.create_user(username='stranger', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.group = Group.objects.create(groupname='Mine', created_by_userid=self.user)
+        self.other_group = Group.objects.create(groupname='Theirs', created_by_userid=self.stranger)
+        GroupMember.objects.create(group=self.group, user=self.user, role='reader')
+        GroupMember.objects.create(group=self.other_group, user=self.stranger, role='leader')
+
+    def search(self, q, **params):
+        response = self.client.get('/api/tasks/search/', {'q': q, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def ids(self, data):
+        return [task['id'] for task in data['results']]
+
+    def test_title_matches_rank_above_comment_matches(self):
+        in_comment = Task.objects.create(title='Groceries', group=self.group, created_by_userid=self.user)
+        Comment.objects.create(task=in_comment, user=self.user, content='remember the invoice')
+        in_title = Task.objects.create(title='Send invoice', group=self.group, created_by_userid=self.user)
+        Task.objects.create(title='Unrelated', group=self.group, created_by_userid=self.user)
+
+        self.assertEqual(self.ids(self.search('invoice')), [in_title.id, in_comment.id])
+        # prefix matching for search-as-you-type
+        self.assertEqual(self.ids(self.search('invo')), [in_title.id, in_comment.id])
+        self.assertEqual(self.ids(self.search('send invoice')), [in_title.id])
+
+    def test_results_are_scoped_to_the_users_groups(self):
+        mine = Task.objects.create(title='Budget review', group=self.group, created_by_userid=self.user)
+        personal = Task.objects.create(title='Budget at home', created_by_userid=self.user)
+        Task.objects.create(title='Budget secret', group=self.other_group, created_by_userid=self.stranger)
+        Task.objects.create(title='Budget private', created_by_userid=self.stranger)
+        Task.objects.create(title='Budget old', group=self.group, created_by_userid=self.user, active=False)
+
+        self.assertEqual(sorted(self.ids(self.search('budget'))), sorted([mine.id, personal.id]))
+
+    def test_index_follows_edits_and_deleted_comments(self):
+        task = Task.objects.create(title='Draft', group=self.group, created_by_userid=self.user)
+        comment = Comment.objects.create(task=task, user=self.user, content='needs a logo')
+        self.assertEqual(self.ids(self.search('logo')), [task.id])
+
+        comment.active = False
+        comment.save()
+        self.assertEqual(self.ids(self.search('logo')), [])
+
+        task.title = 'Final poster'
+        task.save()
+        self.assertEqual(self.ids(self.search('poster')), [task.id])
+        self.assertEqual(self.ids(self.search('draft')), [])
+
+    def test_pagination(self):
+        tasks = [Task.objects.create(title=f'Report {i}', group=self.group, created_by_userid=self.user)
+                 for i in range(5)]
+        first = self.search('report', page_size=2)
+        self.assertEqual(len(first['results']), 2)
+        self.assertIsNone(first['previous'])
+        last = self.search('report', page_size=2, page=3)
+        self.assertEqual(len(last['results']), 1)
+        self.assertIsNone(last['next'])
+        seen = self.ids(first) + self.ids(self.search('report', page_size=2, page=2)) + self.ids(last)
+        self.assertEqual(sorted(seen), [task.id for task in tasks])
+
+    def test_empty_query_is_rejected(self):
+        response = self.client.get('/api/tasks/search/', {'q': '  ?! '})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ThumbnailTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=self.media_root, THUMBNAIL_WORKERS=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='painter', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.group = Group.objects.create(groupname='Studio', created_by_userid=self.user)
+        GroupMember.objects.create(group=self.group, user=self.user, role='leader')
+
+    def image(self, name='photo.png', size=(2000, 1200), color='red'):
+        buffer = BytesIO()
+        Image.new('RGB', size, color).save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def test_upload_produces_variants_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/tasks/', {
+                'title': 'Poster', 'group': self.group.id, 'image': self.image(),
+            }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        task = Task.objects.get(pk=response.data['id'])
+        self.assertEqual(task.image_thumbnails['source'], task.image.name)
+        for size in (64, 256, 1024):
+            with Image.open(default_storage.path(task.image_thumbnails[str(size)])) as variant:
+                self.assertEqual(max(variant.size), size)
+
+        data = self.client.get(f'/api/tasks/{task.id}/').data
+        self.assertEqual(set(data['image_thumbnails']), {'64', '256', '1024'})
+        self.assertTrue(data['image_thumbnails']['64'].startswith('http://testserver/media/thumbnails/'))
+
+    def test_variants_follow_image_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile_picture = self.image('avatar.png')
+            self.user.save()
+        self.user.refresh_from_db()
+        first = self.user.profile_picture_thumbnails['64']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile_picture = self.image('avatar2.png', color='blue')
+            self.user.save()
+        self.user.refresh_from_db()
+        self.assertNotEqual(self.user.profile_picture_thumbnails['64'], first)
+        self.assertFalse(default_storage.exists(first))
+        second = self.user.profile_picture_thumbnails['64']
+
+        # Saving without touching the picture does not re-render
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.first_name = 'Ada'
+            self.user.save()
+        self.assertEqual(callbacks, [])
+
+        self.user.profile_picture = None
+        self.user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_picture_thumbnails, {})
+        self.assertFalse(default_storage.exists(second))
+
+    def test_replaced_image_does_not_take_stale_variants(self):
+        render = thumbnails.render_variants
+
+        def replace_while_rendering(field_file):
+            variants = render(field_file)
+            Group.objects.filter(pk=self.group.pk).update(image='group_images/newer.png')
+            return variants
+
+        with mock.patch('Calentasker.thumbnails.render_variants', replace_while_rendering):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.group.image = self.image('old.png')
+                self.group.save()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.image_thumbnails, {})
+        self.assertEqual(thumbnails.existing_variants('group_images/old.png'), [])
+
+    def test_variants_belong_to_their_own_image_only(self):
+        for name in ('img_64.webp', 'img_256.jpg', 'img_AbCdEf1_64.webp', 'img_notes.txt'):
+            default_storage.save(f'thumbnails/group_images/{name}', ContentFile(b'x'))
+        self.assertEqual(sorted(thumbnails.existing_variants('group_images/img.png')), [
+            'thumbnails/group_images/img_256.jpg', 'thumbnails/group_images/img_64.webp',
+        ])
+        self.assertEqual(thumbnails.existing_variants('group_images/img_AbCdEf1.png'), [
+            'thumbnails/group_images/img_AbCdEf1_64.webp',
+        ])
+
+    def test_generate_thumbnails_command_backfills(self):
+        task = Task.objects.create(title='Old', group=self.group, created_by_userid=self.user)
+        task.image.save('legacy.png', self.image(), save=False)
+        Task.objects.filter(pk=task.pk).update(image=task.image.name)
+
+        call_command('generate_thumbnails', stdout=StringIO())
+        task.refresh_from_db()
+        self.assertEqual(task.image_thumbnails['source'], task.image.name)
+
+
+class BlobStorageTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=self.media_root, BLOB_GC_GRACE=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='archivist', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.group = Group.objects.create(groupname='Archive', created_by_userid=self.user)
+        GroupMember.objects.create(group=self.group, user=self.user, role='leader')
+        self.task = Task.objects.create(title='Docs', group=self.group, created_by_userid=self.user)
+
+    def upload(self, name, content):
+        response = self.client.post('/api/attachments/', {
+            'task': self.task.id, 'uploaded_by_userid': self.user.id,
+            'file': SimpleUploadedFile(name, content),
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Attachments.objects.get(pk=response.data['id'])
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.media_root)
+            for root, _, names in os.walk(self.media_root) for name in names
+        )
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.upload('schema.svg', b'<svg/>')
+        second = self.upload('schema (1).svg', b'<svg/>')
+        other = self.upload('notes.txt', b'other')
+
+        digest = hashlib.sha256(b'<svg/>').hexdigest()
+        self.assertEqual(first.file.name, f'attachments/{digest[:2]}/{digest}.svg')
+        self.assertEqual(second.file.name, first.file.name)
+        self.assertEqual((first.filename, second.filename), ('schema.svg', 'schema (1).svg'))
+        self.assertEqual(len(self.stored_files()), 2)
+        self.assertEqual(Blob.objects.get(name=first.file.name).refcount, 2)
+        self.assertEqual(Blob.objects.get(name=other.file.name).refcount, 1)
+
+    def test_orphans_are_collected_once_unreferenced(self):
+        first = self.upload('a.txt', b'shared')
+        second = self.upload('b.txt', b'shared')
+        name = first.file.name
+
+        first.delete()
+        self.assertEqual(blobs.collect(), [])
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, name)))
+
+        second.delete()
+        self.assertEqual(Blob.objects.get(name=name).refcount, 0)
+        self.assertEqual(blobs.collect(), [name])
+        self.assertEqual(self.stored_files(), [])
+        self.assertFalse(Blob.objects.exists())
+
+    def test_replacing_a_task_image_moves_the_reference(self):
+        self.task.image = SimpleUploadedFile('one.png', b'one')
+        self.task.save()
+        old = self.task.image.name
+        task = Task.objects.get(pk=self.task.pk)
+        task.image = SimpleUploadedFile('two.png', b'two')
+        task.save()
+        self.assertEqual(Blob.objects.get(name=old).refcount, 0)
+        self.assertEqual(Blob.objects.get(name=task.image.name).refcount, 1)
+
+        # Variants of the collected image go with it
+        variant = thumbnails.variant_name(old, 64, 'webp')
+        os.makedirs(os.path.dirname(os.path.join(self.media_root, variant)))
+        with open(os.path.join(self.media_root, variant), 'wb') as thumb:
+            thumb.write(b'thumb')
+        self.assertEqual(blobs.collect(), [old, variant])
+        self.assertEqual(self.stored_files(), [task.image.name])
+
+    def test_collect_repairs_drift_and_removes_stray_files(self):
+        kept = self.upload('kept.txt', b'kept')
+        Blob.objects.filter(name=kept.file.name).update(refcount=0)
+        os.makedirs(os.path.join(self.media_root, 'attachments'), exist_ok=True)
+        with open(os.path.join(self.media_root, 'attachments', '.upload-crashed'), 'wb') as stray:
+            stray.write(b'partial')
+
+        self.assertEqual(blobs.collect(), ['attachments/.upload-crashed'])
+        self.assertEqual(Blob.objects.get(name=kept.file.name).refcount, 1)
+        self.assertEqual(self.stored_files(), [kept.file.name])
+
+    def test_rehash_merges_legacy_copies(self):
+        os.makedirs(os.path.join(self.media_root, 'attachments'))
+        for name in ('db.svg', 'db_Ab12Cd.svg'):
+            with open(os.path.join(self.media_root, 'attachments', name), 'wb') as legacy:
+                legacy.write(b'same bytes')
+            Attachments.objects.create(task=self.task, uploaded_by_userid=self.user, file=f'attachments/{name}')
+
+        out = StringIO()
+        call_command('collect_blobs', '--rehash', stdout=out)
+        names = set(Attachments.objects.values_list('file', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertEqual(self.stored_files(), sorted(names))
+        self.assertEqual(Blob.objects.get(name=names.pop()).refcount, 2)
+
+
+class ChunkedUploadTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=self.media_root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='uploader', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.group = Group.objects.create(groupname='Files', created_by_userid=self.user)
+        GroupMember.objects.create(group=self.group, user=self.user, role='reader')
+        self.task = Task.objects.create(title='Specs', group=self.group, created_by_userid=self.user)
+        self.content = bytes(range(256)) * 40
+
+    def start(self, **extra):
+        response = self.client.post('/api/attachment-uploads/', {
+            'task': self.task.id, 'filename': 'specs.pdf', 'size': len(self.content), **extra,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(response.data['offset'], 0)
+        return f"/api/attachment-uploads/{response.data['id']}/"
+
+    def put(self, url, start, end):
+        return self.client.put(
+            url, self.content[start:end], content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end - 1}/{len(self.content)}',
+        )
+
+    def finalize(self, url, digest=None):
+        return self.client.post(url + 'finalize/', {
+            'sha256': digest or hashlib.sha256(self.content).hexdigest(),
+        }, format='json')
+
+    def test_chunks_resume_and_finalize_into_an_attachment(self):
+        url = self.start()
+        self.assertEqual(self.put(url, 0, 4000).data['offset'], 4000)
+        # The client lost track; it asks where to resume
+        self.assertEqual(self.client.get(url).data['offset'], 4000)
+        conflict = self.put(url, 8000, len(self.content))
+        self.assertEqual(conflict.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(conflict.data['offset'], 4000)
+        # A retried chunk may overlap what was already received
+        self.assertEqual(self.put(url, 3000, 8000).data['offset'], 8000)
+        self.assertEqual(self.put(url, 8000, len(self.content)).data['offset'], len(self.content))
+
+        response = self.finalize(url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        attachment = Attachments.objects.get(pk=response.data['id'])
+        self.assertEqual(attachment.filename, 'specs.pdf')
+        with attachment.file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+        self.assertEqual(Blob.objects.get(name=attachment.file.name).refcount, 1)
+        self.assertFalse(AttachmentUpload.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media_root, uploads.STAGING_DIRECTORY)), [])
+
+    def test_finalize_checks_length_and_checksum(self):
+        url = self.start()
+        self.put(url, 0, 100)
+        incomplete = self.finalize(url)
+        self.assertEqual(incomplete.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(incomplete.data['offset'], 100)
+
+        self.put(url, 100, len(self.content))
+        corrupted = self.finalize(url, digest='0' * 64)
+        self.assertEqual(corrupted.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url).data['offset'], 0)
+        self.assertFalse(Attachments.objects.exists())
+
+    def test_chunks_need_a_matching_content_length(self):
+        url = self.start()
+        for content_length in ('abc', '99'):
+            response = self.client.put(
+                url, self.content[:100], content_type='application/octet-stream',
+                HTTP_CONTENT_RANGE=f'bytes 0-99/{len(self.content)}', CONTENT_LENGTH=content_length,
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url).data['offset'], 0)
+
+    def test_sessions_are_private_and_need_membership(self):
+        url = self.start()
+        stranger = User.objects.create_user(username='stranger', password='password')
+        self.client.force_authenticate(user=stranger)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post('/api/attachment-uploads/', {
+            'task': self.task.id, 'filename': 'x.txt', 'size': 1,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_abandoned_uploads_expire(self):
+        url = self.start()
+        self.put(url, 0, 100)
+        with override_settings(ATTACHMENT_UPLOAD_EXPIRY=-1):
+            self.assertEqual(uploads.expire_uploads(), 1)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, uploads.STAGING_DIRECTORY)), [])
+
+
+class ProtectedMediaTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=self.media_root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='member', password='password')
+        self.stranger = User.objects.create_user(username='stranger', password='password')
+        self.group = Group.objects.create(groupname='Media', created_by_userid=self.user)
+        GroupMember.objects.create(group=self.group, user=self.user, role='reader')
+        self.task = Task.objects.create(title='Plans', group=self.group, created_by_userid=self.user)
+        self.content = b'0123456789' * 10
+        self.attachment = Attachments.objects.create(
+            task=self.task, uploaded_by_userid=self.user,
+            file=SimpleUploadedFile('plan v2.pdf', self.content),
+        )
+        self.url = '/media/' + self.attachment.file.name
+
+    def login(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_only_members_can_read_task_files(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.login(self.stranger)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+
+        self.login(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.body(response), self.content)
+        self.assertIn('filename="plan v2.pdf"', response['Content-Disposition'])
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_signed_urls_from_the_api_work_without_credentials(self):
+        self.client.force_authenticate(user=self.user)
+        signed = self.client.get(f'/api/attachments/{self.attachment.id}/').data['file']
+        self.client.force_authenticate(user=None)
+        self.assertIn('signature=', signed)
+        self.assertEqual(self.client.get(signed).status_code, status.HTTP_200_OK)
+
+        tampered = signed.replace(self.attachment.file.name, 'attachments/other.pdf')
+        self.assertEqual(self.client.get(tampered).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_non_members_get_no_signed_urls(self):
+        self.client.force_authenticate(user=self.stranger)
+        for url in ('/api/attachments/', '/api/tasks/', f'/api/tasks/?group={self.group.id}'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+            self.assertEqual(response.data['results'] if 'results' in response.data else response.data, [], url)
+        response = self.client.get(f'/api/attachments/{self.attachment.id}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_token_is_not_accepted_in_the_query_string(self):
+        key = Token.objects.create(user=self.user).key
+        self.assertEqual(self.client.get(self.url, {'token': key}).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_range_requests(self):
+        self.login(self.user)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(self.body(response), self.content[10:20])
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.content)}')
+
+        suffix = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(self.body(suffix), self.content[-5:])
+        unsatisfiable = self.client.get(self.url, HTTP_RANGE='bytes=500-')
+        self.assertEqual(unsatisfiable.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        # A stale If-Range gets the whole, current file
+        stale = self.client.get(self.url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(stale.status_code, status.HTTP_200_OK)
+
+    def test_conditional_requests(self):
+        self.login(self.user)
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_transfer_can_be_handed_to_the_web_server(self):
+        self.login(self.user)
+        with override_settings(MEDIA_SENDFILE='x-accel-redirect'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.attachment.file.name)
+        self.assertEqual(response.content, b'')
+        with override_settings(MEDIA_SENDFILE='x-sendfile'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.media_root, self.attachment.file.name))
+
+    def test_other_media_stays_public(self):
+        os.makedirs(os.path.join(self.media_root, 'profile_pictures'))
+        with open(os.path.join(self.media_root, 'profile_pictures', 'me.png'), 'wb') as picture:
+            picture.write(b'png')
+        self.assertEqual(self.client.get('/media/profile_pictures/me.png').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_dot_segments_cannot_dodge_the_protected_prefix(self):
+        name = self.attachment.file.name
+        for path in (f'x/../{name}', f'./{name}', name.replace('/', '//', 1), f'/{name}'):
+            self.assertEqual(self.client.get('/media/' + path).status_code, status.HTTP_404_NOT_FOUND, path)
+        # Staging files of chunked uploads are never served
+        os.makedirs(os.path.join(self.media_root, '.uploads'))
+        with open(os.path.join(self.media_root, '.uploads', 'part.part'), 'wb') as part:
+            part.write(b'partial')
+        self.assertEqual(self.client.get('/media/.uploads/part.part').status_code, status.HTTP_404_NOT_FOUND)
+
+
+class MyTasksTest(TestCase):
+    def setUp(self):
+        from datetime import date
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='worker', password='password')
+        self.other = User.objects.create_user(username='lead', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.team = Group.objects.create(groupname='Team', created_by_userid=self.other)
+        self.side = Group.objects.create(groupname='Side', created_by_userid=self.other)
+        self.foreign = Group.objects.create(groupname='Foreign', created_by_userid=self.other)
+        GroupMember.objects.create(group=self.team, user=self.user, role='member')
+        GroupMember.objects.create(group=self.side, user=self.user, role='member')
+
+        self.assigned = Task.objects.create(
+            title='Assigned', group=self.team, created_by_userid=self.other, due_date=date(2026, 5, 3),
+        )
+        Assigned.objects.create(task=self.assigned, user=self.user)
+        self.direct = Task.objects.create(
+            title='Direct', group=self.side, created_by_userid=self.other,
+            assigned_to_userid=self.user, due_date=date(2026, 5, 1),
+        )
+        self.created = Task.objects.create(title='Created', group=self.team, created_by_userid=self.user)
+        self.personal = Task.objects.create(
+            title='Personal', created_by_userid=self.user, due_date=date(2026, 5, 3),
+        )
+        # Not the caller's: someone else's work, a group they left, a deleted task
+        Task.objects.create(title='Unrelated', group=self.team, created_by_userid=self.other)
+        outside = Task.objects.create(title='Outside', group=self.foreign, created_by_userid=self.other)
+        Assigned.objects.create(task=outside, user=self.user)
+        Task.objects.create(title='Deleted', group=self.team, created_by_userid=self.user, active=False)
+
+    def titles(self, response):
+        return [task['title'] for task in response.data['results']]
+
+    def test_lists_own_work_by_due_date(self):
+        response = self.client.get('/api/tasks/mine/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Same due date falls back to id; undated tasks last
+        self.assertEqual(self.titles(response), ['Direct', 'Assigned', 'Personal', 'Created'])
+        self.assertIsNone(response.data['next'])
+
+    def test_skips_inactive_groups(self):
+        self.side.active = False
+        self.side.save()
+        response = self.client.get('/api/tasks/mine/')
+        self.assertNotIn('Direct', self.titles(response))
+
+    def test_cursor_walks_ties_without_repeats(self):
+        seen = []
+        url = '/api/tasks/mine/?page_size=1'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen += self.titles(response)
+            url = response.data['next']
+        self.assertEqual(seen, ['Direct', 'Assigned', 'Personal', 'Created'])
+
+        for cursor in ('garbage', base64.b64encode(json.dumps(['abc', 1]).encode()).decode()):
+            response = self.client.get('/api/tasks/mine/', {'cursor': cursor})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, cursor)
+
+    def test_accepts_list_filters_and_compact(self):
+        response = self.client.get('/api/tasks/mine/', {'group': self.team.id, 'compact': 'true'})
+        self.assertEqual(self.titles(response), ['Assigned', 'Created'])
+        self.assertIn('included', response.data)
+
+    def test_query_count_with_cached_memberships(self):
+        self.client.get('/api/tasks/mine/?compact=true')
+        # One page query (memberships cached) + three prefetches + included groups/users
+        with self.assertNumQueries(6):
+            self.client.get('/api/tasks/mine/?compact=true')
@@ -0,0 +1,130 @@
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from Calentasker.storage import content_addressed_storage
+from .models import Attachments, AttachmentUpload
+
+# Chunked uploads: POST /api/attachment-uploads/ opens a session, each
+# PUT /api/attachment-uploads/<id>/ with "Content-Range: bytes a-b/size"
+# writes one chunk at offset a, and .../finalize/ checks the sha256 and
+# turns the staged file into an Attachments row. Bytes go straight from
+# the request stream to the staging file in CHUNK_SIZE pieces. Staging
+# lives inside the storage location so finalize is a rename.
+STAGING_DIRECTORY = '.uploads'
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """Reported to the client together with the offset to resume from."""
+
+    def __init__(self, message, offset, status_code=400):
+        super().__init__(message)
+        self.offset = offset
+        self.status_code = status_code
+
+
+def staging_path(upload):
+    return content_addressed_storage.path(f'{STAGING_DIRECTORY}/{upload.pk}.part')
+
+
+def received(upload):
+    """Bytes staged so far, i.e. the offset the next chunk has to start at."""
+    try:
+        return os.path.getsize(staging_path(upload))
+    except FileNotFoundError:
+        return 0
+
+
+def write_chunk(upload, start, length, stream):
+    """
+    Copies `length` bytes from `stream` into the staging file at `start`
+    and returns the new offset. A chunk may restart below the current
+    offset (a retried chunk); anything after `start` is replaced.
+    """
+    offset = received(upload)
+    if start > offset:
+        raise UploadError('The chunk does not continue the upload.', offset, status_code=409)
+    if start + length > upload.size:
+        raise UploadError(f'The upload is {upload.size} bytes long.', offset)
+
+    path = staging_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as staged:
+        staged.seek(start)
+        staged.truncate()
+        remaining = length
+        while remaining:
+            chunk = stream.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                # Connection dropped; what arrived is kept for the resume
+                break
+            staged.write(chunk)
+            remaining -= len(chunk)
+    return start + length - remaining
+
+
+def _digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as staged:
+        for chunk in iter(lambda: staged.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def finalize(upload, checksum):
+    """Verifies the staged bytes against `checksum` (sha256 hex) and creates the attachment."""
+    offset = received(upload)
+    if offset != upload.size:
+        raise UploadError(f'Received {offset} of {upload.size} bytes.', offset)
+    path = staging_path(upload)
+    digest = _digest(path)
+    if digest != checksum.strip().lower():
+        # Something was corrupted on the way; start over from offset 0
+        os.unlink(path)
+        raise UploadError('Checksum mismatch; the upload has been reset.', 0)
+
+    upload_to = Attachments._meta.get_field('file').upload_to
+    name = content_addressed_storage.save_local(path, upload_to + upload.filename, digest)
+    with transaction.atomic():
+        attachment = Attachments.objects.create(
+            task=upload.task,
+            uploaded_by_userid=upload.uploaded_by_userid,
+            file=name,
+            filename=upload.filename,
+        )
+        upload.delete()
+    return attachment
+
+
+def discard(upload):
+    if os.path.exists(staging_path(upload)):
+        os.unlink(staging_path(upload))
+    upload.delete()
+
+
+def expire_uploads():
+    """
+    Drops sessions without a chunk for ATTACHMENT_UPLOAD_EXPIRY seconds and
+    staging files without a session. Returns the number of sessions dropped.
+    """
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'ATTACHMENT_UPLOAD_EXPIRY', 86400))
+    expired = 0
+    for upload in AttachmentUpload.objects.filter(created_at__lt=cutoff).iterator():
+        path = staging_path(upload)
+        if os.path.exists(path) and os.path.getmtime(path) >= cutoff.timestamp():
+            continue
+        discard(upload)
+        expired += 1
+
+    directory = content_addressed_storage.path(STAGING_DIRECTORY)
+    if os.path.isdir(directory):
+        sessions = {str(pk) for pk in AttachmentUpload.objects.values_list('pk', flat=True)}
+        for filename in os.listdir(directory):
+            path = os.path.join(directory, filename)
+            if filename.removesuffix('.part') not in sessions and os.path.getmtime(path) < cutoff.timestamp():
+                os.unlink(path)
+    return expired
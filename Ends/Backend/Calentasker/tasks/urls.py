@@ -3,6 +3,7 @@ from .views import (
     TaskViewSet, 
     AssignedViewSet, 
     AttachmentsViewSet,
+    AttachmentUploadViewSet,
     CommentViewSet,
 )
 
@@ -10,4 +11,5 @@ router = DefaultRouter()
 router.register(r'tasks', TaskViewSet, basename='task')
 router.register(r'assignments', AssignedViewSet, basename='assignments')
 router.register(r'attachments', AttachmentsViewSet, basename='attachment')
+router.register(r'attachment-uploads', AttachmentUploadViewSet, basename='attachment-upload')
 router.register(r'comments', CommentViewSet, basename='comment')
\ No newline at end of file
@@ -1,34 +1,84 @@
-from rest_framework import viewsets
+import datetime
+import re
+
+from rest_framework import mixins, serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed, PermissionDenied, ValidationError
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
-from .models import Task, Assigned, Attachments, Comment
+from rest_framework.utils.urls import replace_query_param
+from django.conf import settings
+from django.db.models import Count, Max, OuterRef, Prefetch, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from Calentasker.conditional import ConditionalListMixin
+from Calentasker.media import clean_name, has_valid_signature, is_protected, serve_file
+from Calentasker.pagination import TaskCursorPagination, CommentCursorPagination, DueDateCursorPagination
+from users.authentication import authenticate_token_param
+from groups.permissions import GroupRolePermission, TASK_MANAGER_ROLES, check_group_role, get_group_role, get_memberships
+from . import uploads
+from .bulk import apply_bulk
+from .models import Task, Assigned, Attachments, AttachmentUpload, Comment, TaskMove
+from .search import parse_terms, search_task_ids
 from .serializers import (
     TaskSerializer, 
     AssignedSerializer, 
     AttachmentsSerializer, 
-    CommentSerializer
+    AttachmentUploadSerializer,
+    CommentSerializer,
+    TaskCalendarSerializer,
+    TaskCompactSerializer,
+    get_included,
 )
+from django.http import Http404, JsonResponse
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import never_cache
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_safe
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+
+def visible_tasks_q(request, user=None, prefix=''):
+    """
+    Tasks `user` (defaults to request.user) may see: those of their active
+    groups and their own personal tasks. Every endpoint that serializes
+    tasks or their files applies it, since file URLs in responses are signed.
+    """
+    user = user or request.user
+    return (
+        Q(**{f'{prefix}group_id__in': list(get_memberships(request, user)), f'{prefix}group__active': True}) |
+        Q(**{f'{prefix}group__isnull': True, f'{prefix}created_by_userid': user})
+    )
+
+
+# Browsers keep the last response but must revalidate it (If-None-Match) on every use
+revalidate = method_decorator(cache_control(private=True, no_cache=True, max_age=0), name='dispatch')
 
-@method_decorator(never_cache, name='dispatch')
-class TaskViewSet(viewsets.ModelViewSet):
+@revalidate
+class TaskViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = TaskSerializer
+    pagination_class = TaskCursorPagination
+    permission_classes = [IsAuthenticated, GroupRolePermission]
+    group_role_policy = {
+        'destroy': (TASK_MANAGER_ROLES, "Only Leaders and Operators can delete tasks in this group."),
+    }
 
     def get_queryset(self):
-        # CHANGE: Restored active=True to filter out soft-deleted tasks
-        queryset = Task.objects.select_related(
-            'group', 
-            'created_by_userid', 
-            'assigned_to_userid'
-        ).filter(active=True).order_by('id')
+        queryset = Task.objects.order_by('id')
+        if self.action != 'sync':
+            # CHANGE: Restored active=True to filter out soft-deleted tasks
+            # (sync reports them as tombstones instead)
+            queryset = queryset.filter(active=True)
 
-        # Filters
-        group_id = self.request.query_params.get('group')
-        status = self.request.query_params.get('status')
-        created_by_userid = self.request.query_params.get('created_by_userid')
-        group_isnull = self.request.query_params.get('group__isnull')
+        # Filters; the bulk response lists exactly the tasks it wrote
+        params = self.request.query_params if self.action != 'bulk' else {}
+        group_id = params.get('group')
+        status = params.get('status')
+        created_by_userid = params.get('created_by_userid')
+        group_isnull = params.get('group__isnull')
         
         if group_id:
             queryset = queryset.filter(group_id=group_id)
@@ -46,10 +96,249 @@ class TaskViewSet(viewsets.ModelViewSet):
         # Since we use select_related('group'), we can filter generally on group__active.
         # Tasks with group=None (Own Tasks) have group__active as Null/None, so we need Q objects.
         
-        from django.db.models import Q
         queryset = queryset.filter(Q(group__isnull=True) | Q(group__active=True))
-            
-        return queryset
+        queryset = queryset.filter(visible_tasks_q(self.request))
+
+        if self.action == 'mine':
+            queryset = self.filter_mine(queryset)
+
+        if self.action == 'destroy':
+            # Nothing is serialized; only the group is needed for the role check
+            return queryset.select_related('group')
+
+        if self.action == 'calendar':
+            return queryset.prefetch_related(
+                Prefetch('assignments', queryset=Assigned.objects.only('id', 'task_id', 'user_id').order_by('id')),
+            )
+
+        if self.is_compact_list():
+            # Related rows are side-loaded once per response, see list()
+            return queryset.prefetch_related(
+                Prefetch('assignments', queryset=Assigned.objects.only('id', 'task_id', 'user_id').order_by('id')),
+                Prefetch('comments', queryset=Comment.objects.filter(active=True).only('id', 'task_id').order_by('id')),
+                Prefetch('attachments', queryset=Attachments.objects.only('id', 'task_id').order_by('id')),
+            )
+
+        return queryset.select_related(
+            'group', 
+            'group__created_by_userid',
+            'created_by_userid', 
+            'assigned_to_userid'
+        ).prefetch_related(
+            # AssignedSerializer renders task_detail from obj.task, which the
+            # reverse prefetch points back at the already joined parent row.
+            Prefetch('assignments', queryset=Assigned.objects.select_related('user').order_by('id')),
+            Prefetch('comments', queryset=Comment.objects.filter(active=True).only('id', 'task_id').order_by('id')),
+            Prefetch('attachments', queryset=Attachments.objects.only('id', 'task_id').order_by('id')),
+        )
+
+    def filter_mine(self, queryset):
+        """
+        Tasks the caller created or is assigned to (assigned_to_userid or an
+        Assigned row), in their groups or without a group. Memberships come
+        from the cache, so the page is fetched in one query; each branch of
+        the OR has its own index.
+        """
+        user = self.request.user
+        group_ids = list(get_memberships(self.request))
+        return queryset.filter(
+            Q(group__isnull=True) | Q(group_id__in=group_ids)
+        ).filter(
+            Q(created_by_userid=user) |
+            Q(assigned_to_userid=user) |
+            Q(pk__in=Assigned.objects.filter(user=user).values('task_id'))
+        ).annotate(
+            # Tasks without a due date go last
+            due_key=Coalesce('due_date', Value(datetime.date.max)),
+        )
+
+    def is_compact_list(self):
+        return self.action in ('list', 'mine') and self.request.query_params.get('compact', '').lower() == 'true'
+
+    def get_list_validator(self, queryset):
+        # Child changes touch updated_at (tasks/signals.py); group edits bump version
+        return queryset.annotate(
+            # Latest nested assignee edit per task; a join would repeat task rows
+            assignees_updated=Subquery(
+                Assigned.objects.filter(task=OuterRef('pk'))
+                .order_by('-user__updated_at').values('user__updated_at')[:1]
+            ),
+        ).aggregate(
+            count=Count('id'), updated=Max('updated_at'), groups=Sum('group__version'),
+            # Nested users: renames and new pictures change the response too
+            creators=Max('created_by_userid__updated_at'),
+            assigned=Max('assigned_to_userid__updated_at'),
+            group_creators=Max('group__created_by_userid__updated_at'),
+            assignees=Max('assignees_updated'),
+        )
+
+    def get_list_response(self, request, *args, **kwargs):
+        """
+        ?compact=true returns tasks with group/user ids only and side-loads each
+        referenced group and user once under "included".
+        """
+        if not self.is_compact_list():
+            return super().get_list_response(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        tasks = page if page is not None else list(queryset)
+        data = TaskCompactSerializer(tasks, many=True).data
+        included = get_included(tasks, context=self.get_serializer_context())
+
+        if page is not None:
+            response = self.get_paginated_response(data)
+            response.data['included'] = included
+            return response
+        return Response({'results': data, 'included': included})
+
+    @action(detail=False, methods=['get'], pagination_class=DueDateCursorPagination)
+    def mine(self, request):
+        """
+        The caller's work across all their groups plus their own tasks, by due
+        date (undated last). Accepts the list filters and ?compact=true.
+        """
+        return self.get_list_response(request)
+
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """
+        Tasks whose [start, end] interval overlaps the ?from=..&to= window.
+        Mirrors TaskCalendar.vue: start falls back to created_at, end falls back
+        to start_date and then created_at.
+        """
+        try:
+            date_from = parse_date(request.query_params.get('from') or '')
+            date_to = parse_date(request.query_params.get('to') or '')
+        except ValueError:
+            # well formed but not a real date, e.g. 2024-02-30
+            date_from = date_to = None
+        if not date_from or not date_to:
+            raise ValidationError({'detail': 'from and to are required as YYYY-MM-DD.'})
+        if date_from > date_to:
+            raise ValidationError({'detail': 'from must not be after to.'})
+
+        queryset = self.get_queryset().filter(
+            Q(start_date__lte=date_to) |
+            Q(start_date__isnull=True, created_at__date__lte=date_to)
+        ).filter(
+            Q(due_date__gte=date_from) |
+            Q(due_date__isnull=True, start_date__gte=date_from) |
+            Q(due_date__isnull=True, start_date__isnull=True, created_at__date__gte=date_from)
+        )
+
+        serializer = TaskCalendarSerializer(queryset, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        """
+        Delta sync: tasks and comments changed after ?updated_since= (the
+        watermark returned by the previous call), plus the ids of rows
+        soft-deleted since then and of tasks moved off the ?group= board.
+        Without updated_since the whole (filtered) board is returned, with no
+        tombstones. Accepts the same filters as the list. Rows near the
+        watermark can be sent twice; clients upsert by id.
+        """
+        since = request.query_params.get('updated_since')
+        if since:
+            try:
+                since = parse_datetime(since)
+            except ValueError:
+                since = None
+            if since is None:
+                raise ValidationError({'detail': 'updated_since must be an ISO 8601 timestamp.'})
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+        # Taken before reading and moved back by a margin: a transaction that
+        # stamped updated_at earlier but commits after this read is still
+        # newer than the watermark, so it comes back on the next call.
+        margin = datetime.timedelta(seconds=getattr(settings, 'SYNC_WATERMARK_MARGIN', 60))
+        watermark = timezone.now() - margin
+        board = self.get_queryset()
+        tasks = board
+        comments = Comment.objects.filter(task__in=board.values('id')).select_related('user').order_by('id')
+        moved = []
+        if since:
+            tasks = tasks.filter(updated_at__gt=since)
+            comments = comments.filter(updated_at__gt=since)
+            moved = self.moved_off_board(board, since)
+
+        context = {**self.get_serializer_context(), 'task_scoped': True}
+        return Response({
+            'watermark': serializers.DateTimeField().to_representation(watermark),
+            'tasks': TaskSerializer(tasks.filter(active=True), many=True, context=context).data,
+            'comments': CommentSerializer(comments.filter(active=True), many=True, context=context).data,
+            'deleted': {
+                'tasks': sorted({*tasks.filter(active=False).values_list('id', flat=True), *moved}) if since else [],
+                'comments': list(comments.filter(active=False).values_list('id', flat=True)) if since else [],
+            },
+        })
+
+    def moved_off_board(self, board, since):
+        """Ids of tasks that left the synced group(s) after `since` and are not back."""
+        moves = TaskMove.objects.filter(moved_at__gt=since)
+        group_id = self.request.query_params.get('group')
+        if group_id:
+            moves = moves.filter(group_id=group_id)
+        elif self.request.query_params.get('group__isnull', '').lower() == 'true':
+            moves = moves.filter(group__isnull=True)
+        return list(
+            moves.exclude(task__in=board.filter(active=True).values('id'))
+            .values_list('task_id', flat=True).distinct()
+        )
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Creates, patches and soft-deletes many tasks in one transaction, see
+        tasks.bulk.apply_bulk for the payload and permission rules.
+        """
+        created, updated, deleted = apply_bulk(request, request.data)
+        tasks = self.get_queryset().in_bulk(created + updated)
+        context = self.get_serializer_context()
+        return Response({
+            'created': TaskSerializer([tasks[pk] for pk in created], many=True, context=context).data,
+            'updated': TaskSerializer([tasks[pk] for pk in updated], many=True, context=context).data,
+            'deleted': deleted,
+        })
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Ranked full-text search (?q=) over titles, descriptions and comments
+        of the tasks in the user's groups plus their personal tasks.
+        Paginated with ?page= / ?page_size=.
+        """
+        query = request.query_params.get('q', '').strip()
+        if not parse_terms(query):
+            raise ValidationError({'detail': 'q is required.'})
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+            page_size = min(max(int(request.query_params.get('page_size', SEARCH_PAGE_SIZE)), 1), SEARCH_MAX_PAGE_SIZE)
+        except ValueError:
+            raise ValidationError({'detail': 'page and page_size must be integers.'})
+
+        # One row past the page tells whether there is a next one, no COUNT(*)
+        ids = search_task_ids(
+            query, get_memberships(request).keys(), request.user.pk,
+            limit=page_size + 1, offset=(page - 1) * page_size,
+        )
+        has_next = len(ids) > page_size
+        ids = ids[:page_size]
+        tasks = self.get_queryset().in_bulk(ids)
+        url = request.build_absolute_uri()
+        return Response({
+            'next': replace_query_param(url, 'page', page + 1) if has_next else None,
+            'previous': replace_query_param(url, 'page', page - 1) if page > 1 else None,
+            'results': TaskSerializer(
+                [tasks[pk] for pk in ids if pk in tasks], many=True, context=self.get_serializer_context(),
+            ).data,
+        })
+
+    def get_permission_group(self, obj):
+        return obj.group
 
     def perform_create(self, serializer):
         group = serializer.validated_data.get('group')
@@ -57,58 +346,140 @@ class TaskViewSet(viewsets.ModelViewSet):
 
         # If no group specified, allow creation (or handle as per requirement, assumed allowed for personal if supported)
         if group and created_by:
-            from groups.models import GroupMember
-            from rest_framework.exceptions import PermissionDenied
-            
-            try:
-                membership = GroupMember.objects.get(group=group, user=created_by)
-                # Check Role
-                if membership.role not in ['leader', 'operator']:
-                    raise PermissionDenied("Only Leaders and Operators can create tasks for this server.")
-            except GroupMember.DoesNotExist:
-                 raise PermissionDenied("You are not a member of this server.")
+            check_group_role(
+                self.request, group, TASK_MANAGER_ROLES,
+                "Only Leaders and Operators can create tasks for this server.",
+                not_member_message="You are not a member of this server.",
+                user=created_by,
+            )
 
         serializer.save()
 
     def perform_destroy(self, instance):
-        from groups.models import GroupMember
         from rest_framework.exceptions import PermissionDenied
 
-        user = self.request.user
-        
-        if instance.group:
-            # Group Task: Only Leader or Operator
-            try:
-                member = GroupMember.objects.get(group=instance.group, user=user)
-                if member.role not in ['leader', 'operator']:
-                     raise PermissionDenied("Only Leaders and Operators can delete tasks in this group.")
-            except GroupMember.DoesNotExist:
-                raise PermissionDenied("You are not a member of this group.")
-        else:
+        # Group tasks are covered by group_role_policy in get_object()
+        if not instance.group and instance.created_by_userid != self.request.user:
             # Own Task: Only Creator
-            if instance.created_by_userid != user:
-                raise PermissionDenied("You can only delete your own personal tasks.")
+            raise PermissionDenied("You can only delete your own personal tasks.")
 
         instance.active = False
-        instance.save()
+        instance.save(update_fields=['active', 'updated_at'])
+
+class TaskScopedViewMixin:
+    """
+    Shared by the per-task child endpoints. ?task= narrows the list to one
+    task; the client already has that task, so task_detail is left out and
+    the task joins are skipped.
+    """
+    task_detail_related = ('task__created_by_userid', 'task__assigned_to_userid')
+
+    def is_task_scoped(self):
+        return self.action == 'list' and bool(self.request.query_params.get('task'))
+
+    def scope_queryset(self, queryset, *related):
+        queryset = queryset.filter(visible_tasks_q(self.request, prefix='task__'))
+        task_id = self.request.query_params.get('task')
+        if task_id:
+            queryset = queryset.filter(task_id=task_id)
+        if not self.is_task_scoped():
+            related += self.task_detail_related
+        return queryset.select_related(*related)
 
-class AssignedViewSet(viewsets.ModelViewSet):
-    queryset = Assigned.objects.all()
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['task_scoped'] = self.is_task_scoped()
+        return context
+
+class AssignedViewSet(TaskScopedViewMixin, viewsets.ModelViewSet):
     serializer_class = AssignedSerializer
 
-class AttachmentsViewSet(viewsets.ModelViewSet):
-    queryset = Attachments.objects.all()
+    def get_queryset(self):
+        return self.scope_queryset(Assigned.objects.order_by('id'), 'user')
+
+class AttachmentsViewSet(TaskScopedViewMixin, viewsets.ModelViewSet):
     serializer_class = AttachmentsSerializer
 
-class CommentViewSet(viewsets.ModelViewSet):
+    def get_queryset(self):
+        return self.scope_queryset(Attachments.objects.order_by('id'), 'uploaded_by_userid')
+
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+class AttachmentUploadViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                              mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Resumable attachment uploads (protocol in tasks/uploads.py). GET returns
+    the offset to resume from, DELETE abandons the upload.
+    """
+    serializer_class = AttachmentUploadSerializer
+
+    def get_queryset(self):
+        return AttachmentUpload.objects.filter(uploaded_by_userid=self.request.user).select_related('task')
+
+    def perform_create(self, serializer):
+        task = serializer.validated_data['task']
+        if task.group_id:
+            if get_group_role(self.request, task.group_id) is None:
+                raise PermissionDenied("You are not a member of this server.")
+        elif task.created_by_userid_id != self.request.user.pk:
+            raise PermissionDenied("You can only attach files to your own personal tasks.")
+        serializer.save(uploaded_by_userid=self.request.user)
+
+    def update(self, request, *args, **kwargs):
+        upload = self.get_object()
+        match = CONTENT_RANGE.match(request.headers.get('Content-Range', ''))
+        if not match:
+            raise ValidationError({'detail': 'Send each chunk with a "Content-Range: bytes start-end/size" header.'})
+        start, end, total = map(int, match.groups())
+        length = end - start + 1
+        content_length = request.headers.get('Content-Length', '')
+        if (total != upload.size or length <= 0 or not content_length.isdecimal()
+                or length != int(content_length)):
+            raise ValidationError({'detail': 'Content-Range does not match the upload or the body.'})
+        try:
+            # Read straight from the socket; request.data would buffer the body
+            offset = uploads.write_chunk(upload, start, length, request.stream)
+        except uploads.UploadError as error:
+            return self.upload_error(error)
+        return Response({'id': upload.pk, 'offset': offset, 'size': upload.size})
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        upload = self.get_object()
+        checksum = request.data.get('sha256')
+        if not isinstance(checksum, str) or not checksum:
+            raise ValidationError({'sha256': 'The sha256 hex digest of the whole file is required.'})
+        try:
+            attachment = uploads.finalize(upload, checksum)
+        except uploads.UploadError as error:
+            return self.upload_error(error)
+        serializer = AttachmentsSerializer(attachment, context=self.get_serializer_context())
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def perform_destroy(self, instance):
+        uploads.discard(instance)
+
+    def upload_error(self, error):
+        return Response({'detail': str(error), 'offset': error.offset}, status=error.status_code)
+
+@revalidate
+class CommentViewSet(ConditionalListMixin, TaskScopedViewMixin, viewsets.ModelViewSet):
     serializer_class = CommentSerializer
+    pagination_class = CommentCursorPagination
+
+    def get_list_validator(self, queryset):
+        # Soft deletes drop rows out of the count, edits move updated_at;
+        # the nested task summary and users change the response as well
+        return queryset.aggregate(
+            count=Count('id'), updated=Max('updated_at'), tasks=Max('task__updated_at'),
+            users=Max('user__updated_at'),
+            task_users=Max('task__created_by_userid__updated_at'),
+            task_assigned=Max('task__assigned_to_userid__updated_at'),
+        )
 
     def get_queryset(self):
         queryset = Comment.objects.filter(active=True).order_by('-created_at')
-        task_id = self.request.query_params.get('task')
-        if task_id:
-            queryset = queryset.filter(task_id=task_id)
-        return queryset
+        return self.scope_queryset(queryset, 'user')
 
     def perform_update(self, serializer):
         from rest_framework.exceptions import PermissionDenied
@@ -138,4 +509,43 @@ class CustomAuthToken(ObtainAuthToken):
             'user_id': user.pk,
             'username': user.username,
             'display_username': user.display_username
-        })
\ No newline at end of file
+        })
+
+
+def _tasks_using(name):
+    """Tasks whose attachment, image or image thumbnail is stored under `name`."""
+    if name.startswith('attachments/'):
+        return Task.objects.filter(attachments__file=name)
+    if name.startswith('thumbnails/'):
+        # thumbnails/<image without extension>_<size>.<ext> (Calentasker/thumbnails.py)
+        stem = name.removeprefix('thumbnails/').rsplit('_', 1)[0]
+        return Task.objects.filter(image__startswith=stem + '.')
+    return Task.objects.filter(image=name)
+
+
+@require_safe
+def protected_media(request, name):
+    """
+    Everything under MEDIA_URL. Files of tasks (MEDIA_PROTECTED_PREFIXES) need
+    the signed URL the serializers hand out, or a session/Authorization token
+    of a user who can see one of the tasks using the file; anything else is
+    public.
+    """
+    # Checked against the path storage will actually open
+    name = clean_name(name)
+    if is_protected(name) and not has_valid_signature(request, name):
+        user = request.user if request.user.is_authenticated else None
+        if user is None:
+            try:
+                user = authenticate_token_param(request, allow_query=False)
+            except AuthenticationFailed as exc:
+                return JsonResponse({'detail': str(exc.detail)}, status=401)
+        visible = _tasks_using(name).filter(active=True).filter(visible_tasks_q(request, user))
+        if not visible.exists():
+            # Same answer as for a missing file
+            raise Http404('No such file.')
+
+    filename = None
+    if name.startswith('attachments/'):
+        filename = Attachments.objects.filter(file=name).values_list('filename', flat=True).first()
+    return serve_file(request, name, filename=filename)
@@ -297,7 +297,7 @@ class CalentaskerAPITests(APITestCase):
         # Filter by status
         res_status = self.client.get(f"{self.tasks_url}?status=todo")
         self.assertEqual(res_status.status_code, status.HTTP_200_OK)
-        ids = [t['id'] for t in res_status.data]
+        ids = [t['id'] for t in res_status.data['results']]
         self.assertIn(task_todo_personal.id, ids)
         self.assertNotIn(task_inprog_personal.id, ids)
 
@@ -305,14 +305,14 @@ class CalentaskerAPITests(APITestCase):
         res_group = self.client.get(f"{self.tasks_url}?group={group1.id}")
         self.assertEqual(res_group.status_code, status.HTTP_200_OK)
         # Verify only task_done_group is in the result (among the ones we created)
-        group_ids = [t['id'] for t in res_group.data]
+        group_ids = [t['id'] for t in res_group.data['results']]
         self.assertIn(task_done_group.id, group_ids)
         self.assertNotIn(task_todo_personal.id, group_ids)
 
         # Filter by group IS NULL (Personal Tasks)
         res_null = self.client.get(f"{self.tasks_url}?group__isnull=true")
         self.assertEqual(res_null.status_code, status.HTTP_200_OK)
-        null_ids = [t['id'] for t in res_null.data]
+        null_ids = [t['id'] for t in res_null.data['results']]
         self.assertIn(task_todo_personal.id, null_ids)
         self.assertNotIn(task_done_group.id, null_ids)
 
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+
+def _token_cache():
+    return caches[getattr(settings, 'AUTH_TOKEN_CACHE_ALIAS', 'default')]
+
+
+def _token_cache_key(key):
+    return f'users:auth_token:{key}'
+
+
+def invalidate_token(key):
+    _token_cache().delete(_token_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that keeps the resolved (user, token) pair in a Django
+    cache for AUTH_TOKEN_CACHE_TIMEOUT seconds, so the Token/User join only
+    runs on a cache miss. Failed lookups are never cached.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = _token_cache()
+        cache_key = _token_cache_key(key)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        user, token = super().authenticate_credentials(key)
+        cache.set(cache_key, (user, token), getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 300))
+        return (user, token)
+
+
+def authenticate_token_param(request, allow_query=True):
+    """
+    Token user of a plain Django view. EventSource cannot send headers, so
+    the token may also come as ?token= unless allow_query is False (URLs end
+    up in access logs and Referer headers; media uses signed URLs instead).
+    Raises AuthenticationFailed.
+    """
+    key = request.GET.get('token') if allow_query else None
+    if not key:
+        auth = request.headers.get('Authorization', '').split()
+        key = auth[1] if len(auth) == 2 and auth[0].lower() == 'token' else None
+    if not key:
+        raise AuthenticationFailed('Authentication credentials were not provided.')
+    user, _ = CachedTokenAuthentication().authenticate_credentials(key)
+    return user
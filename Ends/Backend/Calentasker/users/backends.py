@@ -1,6 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
-from django.db.models import Q
+from .lookups import iexact
 
 class EmailOrUsernameModelBackend(ModelBackend):
     """
@@ -19,9 +19,7 @@ class EmailOrUsernameModelBackend(ModelBackend):
         
         try:
             # Try to fetch the user by searching the username or email field
-            user = UserModel.objects.filter(
-                Q(username__iexact=username) | Q(email__iexact=username)
-            ).first()
+            user = iexact(UserModel.objects.all(), username=username, email=username).first()
         except UserModel.DoesNotExist:
             return None
 
@@ -0,0 +1,20 @@
+from django.db.models import Q, Value
+from django.db.models.functions import Lower
+
+
+def iexact(queryset, **lookups):
+    """
+    Case-insensitive equality written as Lower(field) = value, which the
+    Lower() indexes in User.Meta can serve (field__iexact compiles to
+    UPPER()/LIKE and scans the table). Several lookups are ORed.
+    The database lowercases `value` too, since SQLite's LOWER() folds ASCII
+    only; non-ASCII values also try str.lower(), the form User.save()
+    stores emails in.
+    """
+    aliases = {f'{field}_lower': Lower(field) for field in lookups}
+    condition = Q()
+    for field, value in lookups.items():
+        condition |= Q(**{f'{field}_lower': Lower(Value(value))})
+        if not value.isascii():
+            condition |= Q(**{f'{field}_lower': value.lower()})
+    return queryset.alias(**aliases).filter(condition)
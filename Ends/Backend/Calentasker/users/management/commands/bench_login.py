@@ -0,0 +1,63 @@
+import random
+import time
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from users.lookups import iexact
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Login lookup benchmark: the old username__iexact/email__iexact query against '
+        'the Lower() index lookup, then full authenticate() calls. Run it on a scratch database:\n'
+        '  DB_NAME=/tmp/bench.sqlite3 python manage.py migrate\n'
+        '  DB_NAME=/tmp/bench.sqlite3 python manage.py bench_login --users 200000'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000, help='Users to seed for the run.')
+        parser.add_argument('--logins', type=int, default=500, help='Lookups per variant.')
+        parser.add_argument('--authenticate', type=int, default=20,
+                            help='Full authenticate() calls (dominated by password hashing).')
+
+    def handle(self, *args, **options):
+        prefix = f'bench{int(time.time())}'
+        password = make_password('bench-password')
+        User.objects.bulk_create(
+            [User(username=f'{prefix}_{i}', email=f'{prefix}_{i}@example.com', password=password)
+             for i in range(options['users'])],
+            batch_size=1000,
+        )
+        rng = random.Random(0)
+        logins = []
+        for _ in range(options['logins']):
+            i = rng.randrange(options['users'])
+            login = f'{prefix}_{i}' if rng.random() < 0.5 else f'{prefix}_{i}@example.com'
+            logins.append(login.upper() if rng.random() < 0.5 else login)
+
+        try:
+            variants = {
+                'iexact (old)': lambda login: User.objects.filter(
+                    Q(username__iexact=login) | Q(email__iexact=login)).first(),
+                'Lower() index': lambda login: iexact(User.objects.all(), username=login, email=login).first(),
+            }
+            for name, lookup in variants.items():
+                started = time.perf_counter()
+                for login in logins:
+                    assert lookup(login) is not None
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'{name}: {len(logins) / elapsed:.0f} lookups/s, '
+                                  f'{elapsed / len(logins) * 1000:.3f} ms each')
+
+            started = time.perf_counter()
+            for login in logins[:options['authenticate']]:
+                assert authenticate(username=login, password='bench-password') is not None
+            elapsed = time.perf_counter() - started
+            count = min(options['authenticate'], len(logins))
+            if count:
+                self.stdout.write(self.style.SUCCESS(f'authenticate(): {count / elapsed:.1f} logins/s'))
+        finally:
+            User.objects.filter(username__startswith=f'{prefix}_').delete()
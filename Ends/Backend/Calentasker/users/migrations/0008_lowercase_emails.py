@@ -0,0 +1,18 @@
+from django.db import migrations
+from django.db.models.functions import Lower, Trim
+
+
+def lowercase_emails(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    User.objects.exclude(email='').update(email=Lower(Trim('email')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_user_lower_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_emails, migrations.RunPython.noop),
+    ]
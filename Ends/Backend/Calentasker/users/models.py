@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser
 
 class User(AbstractUser):
@@ -26,11 +27,28 @@ class User(AbstractUser):
         },
     )
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
+    # Resized copies of profile_picture, filled in after upload (Calentasker/thumbnails.py)
+    profile_picture_thumbnails = models.JSONField(default=dict, blank=True, editable=False)
     profile_picture_url = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
     date_joined = models.DateTimeField(auto_now_add=True)
+    # Users are nested in task, comment and member lists; part of their ETags
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Prefix range scans for /api/users/search/ (users/search.py)
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+            models.Index(Lower('username'), name='user_username_lower_idx'),
+            models.Index(Lower('first_name'), name='user_first_name_lower_idx'),
+            models.Index(Lower('last_name'), name='user_last_name_lower_idx'),
+        ]
 
     def save(self, *args, **kwargs):
+        # Stored lowercased so logins and invites match it case-insensitively
+        if self.email:
+            self.email = self.email.strip().lower()
+
         if not self.username:
             # Generate username from first and last name
             base_username = f"{self.first_name}_{self.last_name}".strip()
@@ -0,0 +1,62 @@
+from django.db.models import Value
+from django.db.models.functions import Concat, Lower
+from .models import User
+
+SEARCH_LIMIT = 10
+# Searched in this order; email matches rank first
+PREFIX_FIELDS = ('email', 'username', 'first_name', 'last_name')
+# Sorts after every other character, so [q, q + PREFIX_END) is "starts with q"
+PREFIX_END = '\U0010ffff'
+
+
+def _prefix_matches(field, prefix, limit, queryset):
+    """
+    Up to `limit` users whose lowercased `field` starts with `prefix`, as a
+    range scan in key order over the Lower(field) index (see User.Meta).
+    The database lowercases the prefix too, so both sides fold the same way
+    (SQLite's LOWER() leaves non-ASCII letters alone, str.lower() does not).
+    """
+    key = f'{field}_key'
+    folded = Lower(Value(prefix))
+    return list(
+        queryset.annotate(**{key: Lower(field), 'prefix_key': folded})
+        .filter(**{
+            f'{key}__gte': folded,
+            f'{key}__lt': Concat(folded, Value(PREFIX_END)),
+            f'{key}__startswith': folded,
+        })
+        .order_by(key, 'id')[:limit]
+    )
+
+
+def search_users(query, limit=SEARCH_LIMIT):
+    """
+    Autocomplete lookup: prefix matches on email, username, first and last
+    name (and "first last" for two-word queries), at most `limit` users.
+    Exact email first, then email prefixes, then the other fields. Each
+    probe reads at most `limit` index entries, whatever the table size.
+    """
+    prefix = query.strip()
+    if not prefix:
+        return []
+    queryset = User.objects.filter(is_active=True)
+
+    exact, rest, seen = [], [], set()
+    for field in PREFIX_FIELDS:
+        for user in _prefix_matches(field, prefix, limit, queryset):
+            if user.pk in seen:
+                continue
+            seen.add(user.pk)
+            (exact if field == 'email' and user.email_key == user.prefix_key else rest).append(user)
+        if len(exact) + len(rest) >= limit:
+            break
+
+    words = prefix.split()
+    if len(words) == 2 and len(exact) + len(rest) < limit:
+        first, last = words
+        for user in _prefix_matches('first_name', first, limit, queryset.filter(last_name__istartswith=last)):
+            if user.pk not in seen:
+                seen.add(user.pk)
+                rest.append(user)
+
+    return (exact + rest)[:limit]
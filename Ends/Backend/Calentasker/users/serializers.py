@@ -1,11 +1,13 @@
 from rest_framework import serializers
+from Calentasker.thumbnails import ThumbnailURLsField
 from .models import User
 
 class UserSerializer(serializers.ModelSerializer):
+    profile_picture_thumbnails = ThumbnailURLsField()
 
     class Meta:
         model = User
-        fields = ('id', 'username', 'display_username', 'profile_picture', 'profile_picture_url', 'first_name', 'last_name', 'email', 'password', 'is_active', 'date_joined')
+        fields = ('id', 'username', 'display_username', 'profile_picture', 'profile_picture_thumbnails', 'profile_picture_url', 'first_name', 'last_name', 'email', 'password', 'is_active', 'date_joined')
         read_only_fields = ('is_active', 'date_joined')
         extra_kwargs = {
             'password': {'write_only': True},
@@ -30,14 +32,16 @@ class UserSerializer(serializers.ModelSerializer):
         return instance
 
 class UserSearchSerializer(serializers.ModelSerializer):
+    profile_picture_thumbnails = ThumbnailURLsField()
 
     class Meta:
         model = User
-        fields = ('id', 'email', 'username', 'display_username', 'first_name', 'last_name', 'profile_picture')
+        fields = ('id', 'email', 'username', 'display_username', 'first_name', 'last_name', 'profile_picture', 'profile_picture_thumbnails')
 
 class UserListSerializer(serializers.ModelSerializer):
+    profile_picture_thumbnails = ThumbnailURLsField()
 
     class Meta:
         model = User
-        fields = ('id', 'username', 'display_username', 'profile_picture', 'first_name', 'last_name', 'email', 'password')
+        fields = ('id', 'username', 'display_username', 'profile_picture', 'profile_picture_thumbnails', 'first_name', 'last_name', 'email', 'password')
         read_only_fields = fields
\ No newline at end of file
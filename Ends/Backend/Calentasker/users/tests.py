@@ -1,8 +1,11 @@
+from django.db import connection
+from django.db.models.functions import Lower
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from .models import User
+from .search import PREFIX_END
 
 class UserModelTest(TestCase):
     def test_display_username_with_username(self):
@@ -42,6 +45,39 @@ class UserSearchViewTest(TestCase):
         # So user1 should be first.
         self.assertEqual(response.data[0]['id'], self.user1.id)
 
+    def test_search_is_case_insensitive_prefix(self):
+        response = self.client.get('/api/users/search/', {'q': 'SPEC'})
+        self.assertEqual([user['id'] for user in response.data], [self.user1.id, self.user2.id])
+        response = self.client.get('/api/users/search/', {'q': 'example'})
+        self.assertEqual(response.data, [])
+
+    def test_search_full_name(self):
+        doe = User.objects.create_user(username='jd', email='jd@example.com', first_name='John', last_name='Doe')
+        User.objects.create_user(username='js', email='js@example.com', first_name='John', last_name='Smith')
+        response = self.client.get('/api/users/search/', {'q': 'john d'})
+        self.assertEqual([user['id'] for user in response.data], [doe.id])
+
+    def test_search_matches_accented_names(self):
+        adam = User.objects.create_user(username='Ádám_Kovács', email='adam@example.hu', first_name='Ádám', last_name='Kovács')
+        for query in ('Ádám', 'Ádám_KOV', 'Ádám Kov', 'kovács'):
+            response = self.client.get('/api/users/search/', {'q': query})
+            self.assertEqual([user['id'] for user in response.data], [adam.id], query)
+
+    def test_exact_email_ranks_first(self):
+        longer = User.objects.create_user(username='a_first', email='specific@example.com.au')
+        response = self.client.get('/api/users/search/', {'q': 'Specific@Example.com'})
+        self.assertEqual([user['id'] for user in response.data], [self.user1.id, longer.id])
+
+    def test_prefix_probe_uses_lower_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN is SQLite specific')
+        queryset = User.objects.annotate(key=Lower('email')).filter(key__gte='spec', key__lt='spec' + PREFIX_END)
+        sql, params = queryset.order_by('key')[:10].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('user_email_lower_idx', plan)
+
 class UserUpdateTest(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -91,3 +127,70 @@ class UserCreationTest(TestCase):
         user.save()
         user.refresh_from_db()
         self.assertEqual(user.username, 'John_Doe')
+
+class CachedTokenAuthenticationTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from rest_framework.authtoken.models import Token
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='tokenuser', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_lookup_is_cached(self):
+        url = f'/api/users/{self.user.id}/'
+        # token/user join + user detail
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_deactivated_user_is_rejected(self):
+        url = f'/api/users/{self.user.id}/'
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_is_rejected(self):
+        url = f'/api/users/{self.user.id}/'
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        self.token.delete()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class CaseInsensitiveLoginTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='MixedCase', email='  Mixed.Case@Example.COM', password='password')
+
+    def test_email_is_stored_lowercased(self):
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, 'mixed.case@example.com')
+
+    def test_login_ignores_case(self):
+        for login in ('mixedcase', 'MIXEDCASE', 'MIXED.CASE@example.com'):
+            response = self.client.post('/api/login/', {'username': login, 'password': 'password'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK, login)
+            self.assertEqual(response.data['user_id'], self.user.id)
+
+    def test_login_with_accented_username_or_email(self):
+        from users.backends import EmailOrUsernameModelBackend
+        adam = User.objects.create_user(username='Ádám_Kovács', email='Ádám@Example.hu', password='password')
+        backend = EmailOrUsernameModelBackend()
+        for login in ('Ádám_Kovács', 'Ádám_kovács', 'ádám@example.hu', 'ÁDÁM@EXAMPLE.HU'):
+            self.assertEqual(backend.authenticate(None, username=login, password='password'), adam, login)
+
+    def test_login_is_one_indexed_lookup(self):
+        from django.contrib.auth import authenticate
+        with self.assertNumQueries(1):
+            self.assertEqual(authenticate(username='MIXEDCASE', password='password'), self.user)
+
+    def test_group_invite_by_email_ignores_case(self):
+        from groups.models import Group, GroupMember
+        group = Group.objects.create(groupname='Invite', created_by_userid=self.user)
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post('/api/group-members/', {'group': group.id, 'email': 'MIXED.case@example.com'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertTrue(GroupMember.objects.filter(group=group, user=self.user).exists())
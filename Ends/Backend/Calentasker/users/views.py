@@ -1,13 +1,13 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q, Case, When, Value, IntegerField
-from django.core.mail import send_mail
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.conf import settings
+from notifications.outbox import enqueue_email
 from .models import User
+from .search import search_users
 from .serializers import UserSerializer, UserListSerializer, UserSearchSerializer
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -39,16 +39,15 @@ class UserViewSet(viewsets.ModelViewSet):
         # Assuming frontend runs on localhost:5173 as per user context
         verification_url = f"http://localhost:5173/verify-email/{uid}/{token}"
         
-        # Send email
+        # Queue email (delivered by run_mail_worker)
         subject = 'Activate your Calentasker account'
         message = f'Hi {user.username},\n\nPlease click the link below to activate your account:\n\n{verification_url}\n\nThanks!'
         
-        send_mail(
+        enqueue_email(
             subject,
             message,
             settings.DEFAULT_FROM_EMAIL,
             [user.email],
-            fail_silently=False,
         )
 
     @action(detail=False, methods=['post'])
@@ -78,21 +77,7 @@ class UserViewSet(viewsets.ModelViewSet):
         if not query:
             return Response([], status=status.HTTP_200_OK)
 
-        users = User.objects.filter(
-            Q(email__icontains=query) |
-            Q(username__icontains=query) |
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query),
-            is_active=True # Ensure search only returns active users
-        ).annotate(
-            relevance=Case(
-                When(email__iexact=query, then=Value(3)),
-                When(email__icontains=query, then=Value(2)),
-                default=Value(1),
-                output_field=IntegerField(),
-            )
-        ).order_by('-relevance')[:10]
-
+        users = search_users(query)
         serializer = UserSearchSerializer(users, many=True)
         return Response(serializer.data)
 